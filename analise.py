@@ -0,0 +1,183 @@
+import numpy as np
+
+COLUNAS = ("grupo", "n", "media", "mediana", "desvio", "minimo", "maximo", "p10", "p25", "p75", "p90", "aprovacao")
+
+
+def estatisticas_por_grupo(chaves, notas, nota_aprovacao=6.0, nota_maxima=10.0, classes=10):
+    if not len(notas):
+        vazio = {coluna: np.empty(0) for coluna in COLUNAS}
+        vazio["distribuicao"] = np.empty((0, classes), dtype=np.int64)
+        return vazio
+    # Ordena por (grupo, nota): cada grupo vira uma fatia contigua e ordenada, o que da minimo,
+    # maximo e percentis por aritmetica de indices, sem laco em Python.
+    ordem = np.lexsort((notas, chaves))
+    chaves = chaves[ordem]
+    notas = notas[ordem]
+    grupos, inicios, contagens = np.unique(chaves, return_index=True, return_counts=True)
+    soma = np.add.reduceat(notas, inicios)
+    soma_quadrados = np.add.reduceat(notas * notas, inicios)
+    media = soma / contagens
+    variancia = np.maximum(soma_quadrados / contagens - media * media, 0.0)
+
+    def quantil(p):
+        posicao = inicios + p * (contagens - 1)
+        abaixo = np.floor(posicao).astype(np.int64)
+        acima = np.ceil(posicao).astype(np.int64)
+        return notas[abaixo] + (notas[acima] - notas[abaixo]) * (posicao - abaixo)
+
+    aprovados = np.add.reduceat((notas >= nota_aprovacao).astype(np.int64), inicios)
+    indice_grupo = np.repeat(np.arange(len(grupos)), contagens)
+    classe = np.clip((notas / nota_maxima * classes).astype(np.int64), 0, classes - 1)
+    distribuicao = np.bincount(indice_grupo * classes + classe, minlength=len(grupos) * classes)
+    return {
+        "grupo": grupos,
+        "n": contagens,
+        "media": media,
+        "mediana": quantil(0.5),
+        "desvio": np.sqrt(variancia),
+        "minimo": notas[inicios],
+        "maximo": notas[inicios + contagens - 1],
+        "p10": quantil(0.10),
+        "p25": quantil(0.25),
+        "p75": quantil(0.75),
+        "p90": quantil(0.90),
+        "aprovacao": aprovados / contagens,
+        "distribuicao": distribuicao.reshape(len(grupos), classes),
+    }
+
+
+def selecionar(estatisticas, indices, grupos):
+    selecionadas = {coluna: valores[indices] for coluna, valores in estatisticas.items()}
+    selecionadas["grupo"] = grupos
+    return selecionadas
+
+
+class AnaliseNotas:
+    # Copia colunar de Nota em arrays NumPy; atualizar() le so as notas com id acima do ultimo carregado
+    # e, pela tabela Alteracao, aplica as ja carregadas que mudaram ou foram removidas.
+    def __init__(self, nota_aprovacao=6.0, nota_maxima=10.0, tamanho_lote=100000):
+        self.nota_aprovacao = nota_aprovacao
+        self.nota_maxima = nota_maxima
+        self.tamanho_lote = tamanho_lote
+        self.limpar()
+
+    def limpar(self):
+        self.ids = np.empty(0, dtype=np.int64)
+        self.aluno_ids = np.empty(0, dtype=np.int64)
+        self.disciplina_ids = np.empty(0, dtype=np.int64)
+        self.notas = np.empty(0, dtype=np.float64)
+        self.ultimo_id = 0
+        self.ultimo_seq = 0
+
+    def recarregar(self, db):
+        self.limpar()
+        return self.atualizar(db)
+
+    def atualizar(self, db):
+        cursor = db.conn.cursor()
+        # O seq e lido antes das notas: o que for gravado no meio e reaplicado na proxima vez.
+        cursor.execute("SELECT COALESCE(MIN(seq), 1), COALESCE(MAX(seq), 0) FROM Alteracao")
+        primeiro_seq, ultimo_seq = cursor.fetchone()
+        if len(self.ids):
+            if primeiro_seq > self.ultimo_seq + 1:
+                # O log foi podado desde a ultima leitura: as alteracoes no meio se perderam.
+                return self.recarregar(db)
+            self.aplicar_alteradas(cursor)
+        self.ultimo_seq = ultimo_seq
+        cursor.execute("""
+        SELECT id, COALESCE(aluno_id, -1), disciplina_id, nota FROM Nota
+        WHERE id > ? AND disciplina_id IS NOT NULL AND nota IS NOT NULL
+        ORDER BY id
+        """, (self.ultimo_id,))
+        partes = []
+        while True:
+            lote = cursor.fetchmany(self.tamanho_lote)
+            if not lote:
+                break
+            partes.append(np.array(lote, dtype=np.float64))
+        if partes:
+            novas = np.concatenate(partes)
+            self.ids = np.concatenate([self.ids, novas[:, 0].astype(np.int64)])
+            self.aluno_ids = np.concatenate([self.aluno_ids, novas[:, 1].astype(np.int64)])
+            self.disciplina_ids = np.concatenate([self.disciplina_ids, novas[:, 2].astype(np.int64)])
+            self.notas = np.concatenate([self.notas, novas[:, 3]])
+            self.ultimo_id = int(self.ids[-1])
+        cursor.execute("SELECT COUNT(*) FROM Nota WHERE disciplina_id IS NOT NULL AND nota IS NOT NULL")
+        if cursor.fetchone()[0] != len(self.notas):
+            # Rede de seguranca: so diverge se o log perdeu algo (ex.: escrita com os triggers desligados).
+            return self.recarregar(db)
+        self.carregar_relacoes(cursor)
+        return sum(len(parte) for parte in partes)
+
+    def aplicar_alteradas(self, cursor):
+        # Ids ja carregados que o log marca como alterados ou removidos desde a ultima leitura: os que
+        # continuam validos sao atualizados no lugar, os que sumiram ou ficaram nulos saem dos arrays e
+        # os que passaram de nulos a validos entram na posicao certa (self.ids continua ordenado).
+        cursor.execute("""
+        SELECT DISTINCT registro_id FROM Alteracao
+        WHERE seq > ? AND tabela = 'Nota' AND registro_id <= ?
+        """, (self.ultimo_seq, self.ultimo_id))
+        tocados = np.array([linha[0] for linha in cursor.fetchall()], dtype=np.int64)
+        if not len(tocados):
+            return
+        cursor.execute("""
+        SELECT id, COALESCE(aluno_id, -1), disciplina_id, nota FROM Nota
+        WHERE id IN (SELECT registro_id FROM Alteracao WHERE seq > ? AND tabela = 'Nota' AND registro_id <= ?)
+        AND disciplina_id IS NOT NULL AND nota IS NOT NULL
+        ORDER BY id
+        """, (self.ultimo_seq, self.ultimo_id))
+        atuais = np.array(cursor.fetchall(), dtype=np.float64).reshape(-1, 4)
+        atuais_ids = atuais[:, 0].astype(np.int64)
+
+        carregados = np.isin(self.ids, tocados)
+        validos = np.isin(self.ids, atuais_ids)
+        manter = ~carregados | validos
+        if not manter.all():
+            self.ids, self.aluno_ids = self.ids[manter], self.aluno_ids[manter]
+            self.disciplina_ids, self.notas = self.disciplina_ids[manter], self.notas[manter]
+
+        posicoes = np.searchsorted(self.ids, atuais_ids)
+        presentes = np.zeros(len(atuais_ids), dtype=bool)
+        dentro = posicoes < len(self.ids)
+        presentes[dentro] = self.ids[posicoes[dentro]] == atuais_ids[dentro]
+        self.aluno_ids[posicoes[presentes]] = atuais[presentes, 1].astype(np.int64)
+        self.disciplina_ids[posicoes[presentes]] = atuais[presentes, 2].astype(np.int64)
+        self.notas[posicoes[presentes]] = atuais[presentes, 3]
+        if not presentes.all():
+            novas, onde = atuais[~presentes], posicoes[~presentes]
+            self.ids = np.insert(self.ids, onde, novas[:, 0].astype(np.int64))
+            self.aluno_ids = np.insert(self.aluno_ids, onde, novas[:, 1].astype(np.int64))
+            self.disciplina_ids = np.insert(self.disciplina_ids, onde, novas[:, 2].astype(np.int64))
+            self.notas = np.insert(self.notas, onde, novas[:, 3])
+
+    def carregar_relacoes(self, cursor):
+        cursor.execute("SELECT id, COALESCE(curso_id, -1) FROM Disciplina")
+        disciplinas = np.array(cursor.fetchall(), dtype=np.int64).reshape(-1, 2)
+        maior_id = max(int(disciplinas[:, 0].max(initial=0)), int(self.disciplina_ids.max(initial=0)))
+        self.mapa_curso = np.full(maior_id + 1, -1, dtype=np.int64)
+        self.mapa_curso[disciplinas[:, 0]] = disciplinas[:, 1]
+        cursor.execute("SELECT id, disciplina_id FROM Professor WHERE disciplina_id IS NOT NULL")
+        self.professores = np.array(cursor.fetchall(), dtype=np.int64).reshape(-1, 2)
+
+    def estatisticas(self, chaves):
+        return estatisticas_por_grupo(chaves, self.notas, self.nota_aprovacao, self.nota_maxima)
+
+    def por_disciplina(self):
+        return self.estatisticas(self.disciplina_ids)
+
+    def por_aluno(self):
+        return self.estatisticas(self.aluno_ids)
+
+    def por_curso(self):
+        return self.estatisticas(self.mapa_curso[self.disciplina_ids])
+
+    def por_professor(self):
+        # Cada professor leciona uma disciplina: reaproveita as estatisticas dela.
+        disciplinas = self.por_disciplina()
+        grupos = disciplinas["grupo"]
+        professor_ids, professor_disciplinas = self.professores[:, 0], self.professores[:, 1]
+        if not len(grupos):
+            return selecionar(disciplinas, np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64))
+        posicoes = np.minimum(np.searchsorted(grupos, professor_disciplinas), len(grupos) - 1)
+        validos = grupos[posicoes] == professor_disciplinas
+        return selecionar(disciplinas, posicoes[validos], professor_ids[validos])
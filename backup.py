@@ -0,0 +1,195 @@
+import argparse
+import glob
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+
+def abrir_somente_leitura(caminho):
+    return sqlite3.connect(f"file:{caminho}?mode=ro", uri=True)
+
+
+def verificar(caminho):
+    conn = abrir_somente_leitura(caminho)
+    try:
+        return [linha[0] for linha in conn.execute("PRAGMA integrity_check")]
+    finally:
+        conn.close()
+
+
+class CopiaReiniciada(Exception):
+    pass
+
+
+def copiar(origem, destino, paginas=256, pausa=0.005, progresso=None, max_reinicios=3):
+    # Copia online em passos de poucas paginas, com pausa entre eles para a interface e as escritas
+    # andarem. Em WAL, uma transacao de leitura aberta na origem fixa o snapshot: as escritas seguem
+    # no WAL e a copia nunca recomeca. Sem WAL, cada escrita de outra conexao faz o SQLite recomecar;
+    # depois de max_reinicios, o resto e copiado num passo so. O destino so e substituido depois de
+    # a copia passar no integrity_check.
+    parcial = destino + ".parcial"
+    if os.path.exists(parcial):
+        os.remove(parcial)
+    inicio = time.perf_counter()
+    fonte = abrir_somente_leitura(origem)
+    try:
+        if fonte.execute("PRAGMA journal_mode").fetchone()[0] == "wal":
+            fonte.execute("BEGIN")
+            fonte.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+        try:
+            copiar_passos(fonte, parcial, paginas, pausa, progresso, max_reinicios)
+        except CopiaReiniciada:
+            copiar_passos(fonte, parcial, -1, 0, progresso, None)
+    finally:
+        fonte.close()
+    problemas = verificar(parcial)
+    if problemas != ["ok"]:
+        os.remove(parcial)
+        raise sqlite3.DatabaseError("copia falhou no integrity_check: " + "; ".join(problemas[:5]))
+    os.replace(parcial, destino)
+    return {"destino": destino, "bytes": os.path.getsize(destino), "segundos": time.perf_counter() - inicio}
+
+
+def copiar_passos(fonte, parcial, paginas, pausa, progresso, max_reinicios):
+    estado = {"restantes": None, "reinicios": 0}
+
+    def passo(_status, restantes, total):
+        if estado["restantes"] is not None and restantes > estado["restantes"]:
+            estado["reinicios"] += 1
+            if max_reinicios is not None and estado["reinicios"] > max_reinicios:
+                raise CopiaReiniciada()
+        estado["restantes"] = restantes
+        if progresso:
+            progresso(total - restantes, total)
+        if restantes:
+            time.sleep(pausa)
+
+    alvo = sqlite3.connect(parcial)
+    try:
+        fonte.backup(alvo, pages=paginas, progress=passo)
+        # A copia herda o modo WAL da origem; volta ao journal padrao para ser um arquivo so.
+        alvo.execute("PRAGMA journal_mode = DELETE")
+    finally:
+        alvo.close()
+
+
+def nome_snapshot(origem):
+    base = os.path.splitext(os.path.basename(origem))[0]
+    return f"{base}-{time.strftime('%Y%m%d-%H%M%S')}.db"
+
+
+def aplicar_retencao(pasta, origem, manter):
+    # O nome termina com data e hora, entao a ordem alfabetica e a cronologica.
+    base = os.path.splitext(os.path.basename(origem))[0]
+    snapshots = sorted(glob.glob(os.path.join(glob.escape(pasta), f"{glob.escape(base)}-*.db")))
+    removidos = snapshots[:-manter] if manter > 0 else []
+    for caminho in removidos:
+        os.remove(caminho)
+    return removidos
+
+
+def snapshot(origem, pasta, manter=24, **opcoes):
+    os.makedirs(pasta, exist_ok=True)
+    resultado = copiar(origem, os.path.join(pasta, nome_snapshot(origem)), **opcoes)
+    resultado["removidos"] = aplicar_retencao(pasta, origem, manter)
+    return resultado
+
+
+class Agendador:
+    # Tira um snapshot a cada `intervalo` segundos numa thread propria, mantendo os `manter` mais recentes.
+    def __init__(self, origem, pasta, intervalo=3600, manter=24, ao_concluir=None, ao_falhar=None, **opcoes):
+        self.origem = origem
+        self.pasta = pasta
+        self.intervalo = intervalo
+        self.manter = manter
+        self.ao_concluir = ao_concluir
+        self.ao_falhar = ao_falhar
+        self.opcoes = opcoes
+        self.parada = threading.Event()
+        self.thread = threading.Thread(target=self.executar, daemon=True)
+        self.thread.start()
+
+    def executar(self):
+        while not self.parada.is_set():
+            try:
+                resultado = snapshot(self.origem, self.pasta, self.manter, **self.opcoes)
+            except (OSError, sqlite3.Error) as erro:
+                if self.ao_falhar:
+                    self.ao_falhar(erro)
+            else:
+                if self.ao_concluir:
+                    self.ao_concluir(resultado)
+            self.parada.wait(self.intervalo)
+
+    def parar(self):
+        self.parada.set()
+        self.thread.join()
+
+
+def restaurar(copia, banco, paginas=-1):
+    # Grava a copia sobre o banco pela API de backup, que respeita os locks das outras conexoes;
+    # antes, guarda o banco atual ao lado, para desfazer a restauracao se preciso.
+    problemas = verificar(copia)
+    if problemas != ["ok"]:
+        raise sqlite3.DatabaseError(f"{copia} falhou no integrity_check: " + "; ".join(problemas[:5]))
+    anterior = None
+    if os.path.exists(banco):
+        anterior = copiar(banco, f"{os.path.splitext(banco)[0]}.antes-da-restauracao-{time.strftime('%Y%m%d-%H%M%S')}.db")["destino"]
+    fonte = abrir_somente_leitura(copia)
+    alvo = sqlite3.connect(banco)
+    try:
+        fonte.backup(alvo, pages=paginas)
+    finally:
+        alvo.close()
+        fonte.close()
+    return {"banco": banco, "copia": copia, "anterior": anterior}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backup online do banco, snapshots agendados, verificacao e restauracao.")
+    parser.add_argument("--banco", default="university.db")
+    parser.add_argument("--paginas", type=int, default=256, help="paginas copiadas por passo")
+    parser.add_argument("--pausa", type=float, default=0.005, help="segundos de pausa entre passos")
+    subparsers = parser.add_subparsers(dest="comando", required=True)
+    copia = subparsers.add_parser("copiar", help="copia o banco agora")
+    copia.add_argument("destino")
+    agenda = subparsers.add_parser("agendar", help="tira snapshots periodicos ate ser interrompido")
+    agenda.add_argument("--pasta", default="backups")
+    agenda.add_argument("--intervalo", type=float, default=3600, help="segundos entre snapshots")
+    agenda.add_argument("--manter", type=int, default=24, help="quantos snapshots guardar")
+    verificacao = subparsers.add_parser("verificar", help="roda PRAGMA integrity_check numa copia")
+    verificacao.add_argument("arquivo")
+    restauracao = subparsers.add_parser("restaurar", help="substitui o banco por uma copia verificada")
+    restauracao.add_argument("arquivo")
+    args = parser.parse_args()
+
+    opcoes = {"paginas": args.paginas, "pausa": args.pausa}
+    if args.comando == "copiar":
+        resultado = copiar(args.banco, args.destino, **opcoes)
+        print(f"{resultado['bytes'] / 1024:.0f} KiB copiados para {resultado['destino']} em {resultado['segundos']:.1f} s")
+    elif args.comando == "agendar":
+        agendador = Agendador(
+            args.banco, args.pasta, args.intervalo, args.manter,
+            ao_concluir=lambda resultado: print(f"{time.strftime('%H:%M:%S')} {resultado['destino']} "
+                                                f"({len(resultado['removidos'])} antigos removidos)", flush=True),
+            ao_falhar=lambda erro: print(f"{time.strftime('%H:%M:%S')} falha no snapshot: {erro}", file=sys.stderr, flush=True),
+            **opcoes)
+        try:
+            agendador.thread.join()
+        except KeyboardInterrupt:
+            agendador.parar()
+    elif args.comando == "verificar":
+        problemas = verificar(args.arquivo)
+        print("\n".join(problemas))
+        sys.exit(0 if problemas == ["ok"] else 1)
+    else:
+        resultado = restaurar(args.arquivo, args.banco)
+        if resultado["anterior"]:
+            print(f"Banco anterior guardado em {resultado['anterior']}")
+        print(f"{args.banco} restaurado a partir de {args.arquivo}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+import argparse
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import subprocess
+import tempfile
+import time
+from database import Database, QueryCache
+
+NOMES = ["Ana", "Bruno", "Carla", "Daniel", "Eduarda", "Felipe", "Gabriela", "Henrique", "Isabela", "João",
+         "Larissa", "Lucas", "Mariana", "Mateus", "Natália", "Otávio", "Paula", "Rafael", "Sofia", "Thiago"]
+SOBRENOMES = ["Silva", "Santos", "Oliveira", "Souza", "Rodrigues", "Ferreira", "Alves", "Pereira", "Lima",
+              "Gomes", "Costa", "Ribeiro", "Martins", "Carvalho", "Almeida", "Lopes", "Araújo", "Conceição"]
+AREAS = ["Engenharia", "Medicina", "Direito", "Administração", "Computação", "Letras", "Física", "Química",
+         "Matemática", "Arquitetura", "Psicologia", "História"]
+TEMAS = ["Cálculo", "Álgebra", "Estruturas", "Fundamentos", "Tópicos", "Laboratório", "Introdução",
+         "Métodos", "Teoria", "Projeto", "Seminário", "Análise"]
+
+
+def nome_pessoa(aleatorio):
+    return f"{aleatorio.choice(NOMES)} {aleatorio.choice(SOBRENOMES)} {aleatorio.choice(SOBRENOMES)}"
+
+
+def popular(db, cursos, disciplinas, professores, alunos, notas, semente=42, tamanho_lote=10000):
+    aleatorio = random.Random(semente)
+    db.inserir_muitos("Curso", ((i, f"{AREAS[i % len(AREAS)]} {i}") for i in range(1, cursos + 1)),
+                      tamanho_lote=tamanho_lote)
+    curso_da_disciplina = [None] + [aleatorio.randint(1, cursos) for _ in range(disciplinas)]
+    db.inserir_muitos("Disciplina", (
+        (i, f"{aleatorio.choice(TEMAS)} {i}", curso_da_disciplina[i]) for i in range(1, disciplinas + 1)
+    ), tamanho_lote=tamanho_lote)
+    disciplinas_do_curso = {curso: [] for curso in range(1, cursos + 1)}
+    for disciplina, curso in enumerate(curso_da_disciplina[1:], start=1):
+        disciplinas_do_curso[curso].append(disciplina)
+    db.inserir_muitos("Professor", (
+        (i, nome_pessoa(aleatorio), curso_da_disciplina[d], d)
+        for i, d in ((i, aleatorio.randint(1, disciplinas)) for i in range(1, professores + 1))
+    ), tamanho_lote=tamanho_lote)
+    curso_do_aluno = [aleatorio.randint(1, cursos) for _ in range(alunos)]
+    db.inserir_muitos("Aluno", (
+        (i, nome_pessoa(aleatorio), curso_do_aluno[i - 1]) for i in range(1, alunos + 1)
+    ), tamanho_lote=tamanho_lote)
+
+    por_aluno = max(1, notas // max(alunos, 1))
+    pares = []
+
+    def gerar_pares():
+        restantes = notas
+        for aluno, curso in enumerate(curso_do_aluno, start=1):
+            opcoes = disciplinas_do_curso[curso]
+            if restantes <= 0 or not opcoes:
+                continue
+            quantidade = min(por_aluno, len(opcoes), restantes)
+            restantes -= quantidade
+            for disciplina in aleatorio.sample(opcoes, quantidade):
+                pares.append((aluno, disciplina))
+                yield aluno, disciplina
+
+    db.inserir_muitos("Matricula", gerar_pares(), tamanho_lote=tamanho_lote)
+    db.inserir_muitos("Nota", (
+        (aluno, disciplina, round(min(10.0, max(0.0, aleatorio.gauss(6.5, 2.0))), 1)) for aluno, disciplina in pares
+    ), colunas=("aluno_id", "disciplina_id", "nota"), tamanho_lote=tamanho_lote)
+    db.conn.execute("ANALYZE")
+    return pares
+
+
+def percentis(duracoes):
+    if not duracoes:
+        return {}
+    if len(duracoes) > 1:
+        cortes = statistics.quantiles(duracoes, n=100, method="inclusive")
+        p50, p95, p99 = cortes[49], cortes[94], cortes[98]
+    else:
+        p50 = p95 = p99 = duracoes[0]
+    return {
+        "chamadas": len(duracoes),
+        "p50_ms": p50 * 1000,
+        "p95_ms": p95 * 1000,
+        "p99_ms": p99 * 1000,
+    }
+
+
+def medir(funcao, argumentos):
+    duracoes = []
+    inicio_total = time.perf_counter()
+    for args in argumentos:
+        inicio = time.perf_counter()
+        funcao(*args)
+        duracoes.append(time.perf_counter() - inicio)
+    total = time.perf_counter() - inicio_total
+    return {**percentis(duracoes), "por_segundo": len(duracoes) / total if total else 0.0}
+
+
+def cenarios(db, volumes, pares, repeticoes, aleatorio):
+    cursos, disciplinas, alunos = volumes["cursos"], volumes["disciplinas"], volumes["alunos"]
+
+    def ids(maximo):
+        return [(aleatorio.randint(1, maximo),) for _ in range(repeticoes)]
+
+    amostra = [aleatorio.choice(pares) for _ in range(repeticoes)] if pares else [(1, 1)] * repeticoes
+    novos_cursos = range(cursos + 1, cursos + repeticoes + 1)
+    return [
+        ("listar[Curso]", db.listar, [("Curso",)] * repeticoes),
+        ("listar[Disciplina]", db.listar, [("Disciplina",)] * max(1, repeticoes // 10)),
+        ("listar[Aluno]", db.listar, [("Aluno",)] * max(1, repeticoes // 100)),
+        ("listar_pagina", lambda apos: db.listar_pagina("Aluno", apos_id=apos), ids(alunos)),
+        ("contar", db.contar, [("Aluno",)] * max(1, repeticoes // 10)),
+        ("intervalo_ids", db.intervalo_ids, [("Aluno",)] * repeticoes),
+        ("buscar", lambda termo: db.buscar("Aluno", termo, 20),
+         [(aleatorio.choice(SOBRENOMES)[:4],) for _ in range(repeticoes)]),
+        ("listar_notas_por_disciplina", db.listar_notas_por_disciplina, ids(disciplinas)),
+        ("listar_disciplinas_por_curso", db.listar_disciplinas_por_curso, ids(cursos)),
+        ("listar_alunos_por_disciplina", db.listar_alunos_por_disciplina, ids(disciplinas)),
+        ("listar_professores_por_disciplina", db.listar_professores_por_disciplina, ids(disciplinas)),
+        ("listar_professores_por_curso", db.listar_professores_por_curso, ids(cursos)),
+        ("matricula_existe", db.matricula_existe, amostra),
+        ("inserir", lambda i: db.inserir("Curso", (i, f"Curso {i}")), [(i,) for i in novos_cursos]),
+        ("atualizar", lambda i: db.atualizar("Curso", "nome", f"Curso {i} (novo)", i), [(i,) for i in novos_cursos]),
+        ("inserir_nota", db.inserir_nota, [(a, d, 7.5) for a, d in amostra]),
+        ("reajustar_notas", lambda d: db.reajustar_notas(d, fator=1.0, acrescimo=0.5), ids(disciplinas)),
+        ("remover", lambda i: db.remover("Curso", i), [(i,) for i in novos_cursos]),
+        ("inserir_muitos[1000]", lambda lote: db.inserir_muitos("Nota", lote, ("aluno_id", "disciplina_id", "nota")),
+         [([(a, d, 5.0) for a, d in amostra[:1000]],)] * max(1, repeticoes // 20)),
+    ]
+
+
+def versao_git(pasta=None):
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=pasta or os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def executar(args):
+    volumes = {
+        "cursos": args.cursos,
+        "disciplinas": args.disciplinas,
+        "professores": args.professores,
+        "alunos": args.alunos,
+        "notas": args.notas,
+    }
+    with tempfile.TemporaryDirectory() as pasta:
+        caminho = args.banco or os.path.join(pasta, "benchmark.db")
+        db = Database(caminho, desempenho=args.desempenho, cache=QueryCache() if args.cache else None)
+        inicio = time.perf_counter()
+        pares = popular(db, semente=args.semente, **volumes)
+        geracao = time.perf_counter() - inicio
+        aleatorio = random.Random(args.semente + 1)
+        resultados = {}
+        for nome, funcao, argumentos in cenarios(db, volumes, pares, args.repeticoes, aleatorio):
+            resultados[nome] = medir(funcao, argumentos)
+        db.conn.close()
+    relatorio = {
+        "commit": versao_git(),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "volumes": volumes,
+        "repeticoes": args.repeticoes,
+        "desempenho": args.desempenho,
+        "cache": args.cache,
+        "geracao_s": geracao,
+        "metodos": resultados,
+    }
+    if args.cache:
+        relatorio["cache_estatisticas"] = db.cache.estatisticas()
+    return relatorio
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark da camada Database sobre dados sinteticos.")
+    parser.add_argument("--cursos", type=int, default=50)
+    parser.add_argument("--disciplinas", type=int, default=5000)
+    parser.add_argument("--professores", type=int, default=2000)
+    parser.add_argument("--alunos", type=int, default=500000)
+    parser.add_argument("--notas", type=int, default=5000000)
+    parser.add_argument("--repeticoes", type=int, default=200)
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument("--banco", help="arquivo do banco (padrao: temporario, apagado ao final)")
+    parser.add_argument("--desempenho", action="store_true", help="usa o perfil WAL de desempenho")
+    parser.add_argument("--cache", action="store_true", help="ativa o QueryCache")
+    parser.add_argument("--saida", help="grava o JSON neste arquivo em vez da saida padrao")
+    args = parser.parse_args()
+    relatorio = json.dumps(executar(args), indent=2, ensure_ascii=False)
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as arquivo:
+            arquivo.write(relatorio + "\n")
+    else:
+        print(relatorio)
+
+
+if __name__ == "__main__":
+    main()
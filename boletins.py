@@ -0,0 +1,144 @@
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from itertools import islice
+import matplotlib
+
+matplotlib.use("Agg")
+
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from database import Database
+
+# Estado de cada processo do pool: uma conexao somente leitura e uma Figure reaproveitada.
+db_worker = None
+figura_worker = None
+
+
+def iniciar_worker(caminho):
+    global db_worker, figura_worker
+    db_worker = Database(caminho, somente_leitura=True)
+    figura_worker = Figure(figsize=(8.27, 5.83))
+    FigureCanvasAgg(figura_worker)
+
+
+def desenhar_disciplina(figura, disciplina, notas):
+    valores = np.array([nota for _, nota in notas if nota is not None], dtype=float)
+    ax = figura.add_subplot()
+    ax.hist(valores, bins=20, range=(0, 10), color="tab:blue", edgecolor="white")
+    if len(valores):
+        ax.axvline(valores.mean(), color="red", label=f"Média {valores.mean():.2f}")
+        ax.axvline(np.median(valores), color="green", linestyle="--", label=f"Mediana {np.median(valores):.2f}")
+        ax.legend()
+    ax.set_xlabel("Notas")
+    ax.set_ylabel("Alunos")
+    ax.set_title(f"{disciplina[1]} (ID {disciplina[0]}) - {len(valores)} notas")
+
+
+def desenhar_boletim(figura, aluno, historico):
+    # Nota NULL (ainda nao lancada) fica fora do boletim, como na analise e nos resumos.
+    historico = [linha for linha in historico if linha[2] is not None]
+    ax = figura.add_subplot()
+    nomes = [linha[1] for linha in historico]
+    notas = [linha[2] for linha in historico]
+    posicoes = np.arange(len(notas))
+    cores = ["tab:green" if nota >= 6 else "tab:red" for nota in notas]
+    ax.barh(posicoes, notas, color=cores)
+    ax.set_yticks(posicoes, nomes)
+    ax.invert_yaxis()
+    ax.set_xlim(0, 10)
+    ax.set_xlabel("Nota")
+    media = f" - Média {np.mean(notas):.2f}" if notas else ""
+    ax.set_title(f"Boletim de {aluno[1]} (ID {aluno[0]}){media}")
+    figura.subplots_adjust(left=0.35)
+
+
+def gerar_lote(tipo, ids, pasta, formato):
+    # Um arquivo com erro e registrado em falhas; os demais do lote continuam.
+    geradas = 0
+    falhas = []
+    for id in ids:
+        figura_worker.clear()
+        try:
+            if tipo == "disciplinas":
+                disciplina = db_worker.obter("Disciplina", id)
+                desenhar_disciplina(figura_worker, disciplina, db_worker.listar_notas_por_disciplina(id))
+                nome = f"disciplina_{id}.{formato}"
+            else:
+                aluno = db_worker.obter("Aluno", id)
+                _, historico = db_worker.iterar_historico_aluno(id)
+                desenhar_boletim(figura_worker, aluno, list(historico))
+                nome = f"boletim_{id}.{formato}"
+            figura_worker.savefig(os.path.join(pasta, tipo, nome), format=formato)
+        except Exception as erro:
+            falhas.append((tipo, id, repr(erro)))
+            continue
+        geradas += 1
+    return geradas, falhas
+
+
+def lotes(ids, tamanho):
+    ids = iter(ids)
+    while True:
+        lote = list(islice(ids, tamanho))
+        if not lote:
+            return
+        yield lote
+
+
+def gerar(caminho, pasta, tipos=("disciplinas", "alunos"), formato="png", processos=None, tamanho_lote=25,
+          progresso=None):
+    db = Database(caminho, somente_leitura=True)
+    tarefas = []
+    for tipo in tipos:
+        os.makedirs(os.path.join(pasta, tipo), exist_ok=True)
+        tabela = "Disciplina" if tipo == "disciplinas" else "Aluno"
+        _, ids = db.iterar(f"SELECT id FROM {tabela} ORDER BY id")
+        tarefas.extend((tipo, lote) for lote in lotes((linha[0] for linha in ids), tamanho_lote))
+    db.conn.close()
+
+    total = 0
+    falhas = []
+    with ProcessPoolExecutor(max_workers=processos, initializer=iniciar_worker, initargs=(caminho,)) as executor:
+        futuros = {executor.submit(gerar_lote, tipo, lote, pasta, formato): (tipo, lote) for tipo, lote in tarefas}
+        for futuro in as_completed(futuros):
+            try:
+                geradas, falhas_lote = futuro.result()
+            except Exception as erro:
+                # O processo do lote morreu (ou o pool quebrou): o lote inteiro conta como falha.
+                tipo, lote = futuros[futuro]
+                geradas, falhas_lote = 0, [(tipo, id, repr(erro)) for id in lote]
+            total += geradas
+            falhas.extend(falhas_lote)
+            if progresso:
+                progresso(total)
+    return total, falhas
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gera boletins por aluno e graficos por disciplina em paralelo, sem display.")
+    parser.add_argument("--banco", default="university.db")
+    parser.add_argument("--saida", default="relatorios")
+    parser.add_argument("--formato", choices=("png", "pdf", "svg"), default="png")
+    parser.add_argument("--processos", type=int, default=os.cpu_count())
+    parser.add_argument("--lote", type=int, default=25, help="arquivos por tarefa enviada ao pool")
+    parser.add_argument("--somente", choices=("disciplinas", "alunos"), help="gera apenas um dos tipos")
+    args = parser.parse_args()
+    tipos = (args.somente,) if args.somente else ("disciplinas", "alunos")
+    inicio = time.perf_counter()
+    total, falhas = gerar(args.banco, args.saida, tipos, args.formato, args.processos, args.lote,
+                          progresso=lambda geradas: print(f"\r{geradas} arquivos", end="", file=sys.stderr))
+    duracao = time.perf_counter() - inicio
+    print(file=sys.stderr)
+    print(f"{total} arquivos em {duracao:.1f} s ({total / duracao:.1f}/s) com {args.processos} processos")
+    for tipo, id, erro in falhas:
+        print(f"Falha em {tipo} {id}: {erro}", file=sys.stderr)
+    if falhas:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
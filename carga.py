@@ -0,0 +1,141 @@
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from benchmark import SOBRENOMES, percentis, popular
+from cliente import DatabaseRemoto
+from database import Database
+
+
+def esperar_servidor(url, processo, limite=30):
+    cliente = DatabaseRemoto(url, timeout=1)
+    prazo = time.monotonic() + limite
+    while time.monotonic() < prazo:
+        if processo.poll() is not None:
+            raise RuntimeError("o servidor terminou antes de aceitar conexoes")
+        try:
+            cliente.ultima_alteracao()
+            return
+        except OSError:
+            time.sleep(0.1)
+        finally:
+            cliente.fechar()
+    raise RuntimeError("o servidor nao respondeu a tempo")
+
+
+def operacoes(db, volumes, pares, aleatorio):
+    disciplinas, alunos = volumes["disciplinas"], volumes["alunos"]
+    leituras = [
+        ("listar_pagina", lambda: db.listar_pagina("Aluno", apos_id=aleatorio.randint(1, alunos))),
+        ("buscar", lambda: db.buscar("Aluno", aleatorio.choice(SOBRENOMES)[:4], 20)),
+        ("listar_notas_por_disciplina", lambda: db.listar_notas_por_disciplina(aleatorio.randint(1, disciplinas))),
+        ("listar_alunos_por_disciplina", lambda: db.listar_alunos_por_disciplina(aleatorio.randint(1, disciplinas))),
+    ]
+    escritas = [
+        ("inserir_nota", lambda: db.inserir_nota(*aleatorio.choice(pares), round(aleatorio.uniform(0, 10), 1))),
+        ("matricular", lambda: db.matricular(*aleatorio.choice(pares))),
+    ]
+    return leituras, escritas
+
+
+def cliente(url, volumes, pares, proporcao_escrita, duracao, semente, duracoes, erros):
+    db = DatabaseRemoto(url)
+    aleatorio = random.Random(semente)
+    leituras, escritas = operacoes(db, volumes, pares, aleatorio)
+    fim = time.perf_counter() + duracao
+    while time.perf_counter() < fim:
+        nome, executar = aleatorio.choice(escritas if aleatorio.random() < proporcao_escrita else leituras)
+        inicio = time.perf_counter()
+        try:
+            executar()
+        except Exception:
+            erros[nome] = erros.get(nome, 0) + 1
+            continue
+        duracoes.setdefault(nome, []).append(time.perf_counter() - inicio)
+    db.fechar()
+
+
+def executar(args, url, volumes, pares):
+    resultados = []
+    for clientes in args.clientes:
+        duracoes = [{} for _ in range(clientes)]
+        erros = [{} for _ in range(clientes)]
+        threads = [
+            threading.Thread(target=cliente, args=(url, volumes, pares, args.escritas, args.duracao,
+                                                   args.semente + i, duracoes[i], erros[i]))
+            for i in range(clientes)
+        ]
+        inicio = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        total = time.perf_counter() - inicio
+        por_operacao = {}
+        for registro in duracoes:
+            for nome, valores in registro.items():
+                por_operacao.setdefault(nome, []).extend(valores)
+        todas = [valor for valores in por_operacao.values() for valor in valores]
+        falhas = {}
+        for registro in erros:
+            for nome, quantidade in registro.items():
+                falhas[nome] = falhas.get(nome, 0) + quantidade
+        resultados.append({
+            "clientes": clientes,
+            "requisicoes_por_segundo": len(todas) / total,
+            "geral": percentis(todas),
+            "operacoes": {nome: percentis(valores) for nome, valores in sorted(por_operacao.items())},
+            "erros": falhas,
+        })
+        print(f"{clientes:4d} clientes: {len(todas) / total:8.0f} req/s", file=sys.stderr)
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Teste de carga do servidor JSON com clientes concorrentes.")
+    parser.add_argument("--clientes", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--duracao", type=float, default=10.0, help="segundos por rodada")
+    parser.add_argument("--escritas", type=float, default=0.1, help="fracao das requisicoes que escrevem")
+    parser.add_argument("--leitores", type=int, default=4, help="conexoes de leitura do servidor")
+    parser.add_argument("--porta", type=int, default=8799)
+    parser.add_argument("--alunos", type=int, default=50000)
+    parser.add_argument("--disciplinas", type=int, default=1000)
+    parser.add_argument("--notas", type=int, default=500000)
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument("--saida", help="grava o JSON neste arquivo em vez da saida padrao")
+    args = parser.parse_args()
+
+    volumes = {"cursos": 20, "disciplinas": args.disciplinas, "professores": args.disciplinas // 2,
+               "alunos": args.alunos, "notas": args.notas}
+    with tempfile.TemporaryDirectory() as pasta:
+        caminho = os.path.join(pasta, "carga.db")
+        db = Database(caminho, desempenho=True)
+        pares = popular(db, semente=args.semente, **volumes)
+        db.fechar()
+        url = f"http://127.0.0.1:{args.porta}"
+        servidor = subprocess.Popen([
+            sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "servidor.py"),
+            "--banco", caminho, "--porta", str(args.porta), "--leitores", str(args.leitores),
+        ], stdout=subprocess.DEVNULL)
+        try:
+            esperar_servidor(url, servidor)
+            resultados = executar(args, url, volumes, pares)
+        finally:
+            servidor.terminate()
+            servidor.wait()
+    relatorio = json.dumps({"volumes": volumes, "escritas": args.escritas, "leitores": args.leitores,
+                            "duracao_s": args.duracao, "rodadas": resultados}, indent=2, ensure_ascii=False)
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as arquivo:
+            arquivo.write(relatorio + "\n")
+    else:
+        print(relatorio)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+import http.client
+import json
+import time
+from functools import partial
+from itertools import islice
+from urllib.parse import urlsplit
+from database import Database, linhas_csv
+
+
+# Operacoes do Database expostas em POST /<operacao> com corpo {"args": [...], "kwargs": {...}}.
+LEITURAS = {
+    "listar", "listar_pagina", "contar", "intervalo_ids", "buscar", "obter",
+    "listar_notas_por_disciplina", "listar_disciplinas_por_curso", "listar_alunos_por_disciplina",
+    "listar_professores_por_disciplina", "listar_professores_por_curso",
+    "resumo_disciplina", "resumo_aluno", "coeficiente_rendimento",
+    "previa_matricula_curso", "matricula_existe", "ultima_alteracao", "listar_alteracoes",
+    "tabelas_com_alteracoes",
+}
+ESCRITAS = {
+    "inserir", "inserir_muitos", "remover", "remover_muitos", "atualizar", "inserir_nota", "matricular",
+    "matricular_curso", "reajustar_notas", "desfazer_reajuste",
+}
+
+# Operacoes que devolvem uma unica linha (tupla) em vez de uma lista de linhas.
+LINHA_UNICA = {"obter", "intervalo_ids", "inserir_muitos"}
+
+
+class ErroServidor(Exception):
+    def __init__(self, status, mensagem):
+        super().__init__(mensagem)
+        self.status = status
+
+
+class DatabaseRemoto:
+    # Mesma interface do Database para as operacoes expostas pelo servidor. Cada instancia mantem
+    # uma conexao HTTP keep-alive; use uma por thread, como as conexoes sqlite3.
+    def __init__(self, url="http://127.0.0.1:8765", instrumentacao=None, timeout=30):
+        partes = urlsplit(url)
+        self.caminho = url
+        self.host = partes.hostname
+        self.porta = partes.port or 80
+        self.timeout = timeout
+        self.cache = None
+        self.instrumentacao = instrumentacao
+        self.conexao = None
+
+    def requisitar(self, operacao, args, kwargs):
+        corpo = json.dumps({"args": args, "kwargs": kwargs})
+        for tentativa in range(2):
+            if self.conexao is None:
+                self.conexao = http.client.HTTPConnection(self.host, self.porta, timeout=self.timeout)
+            try:
+                self.conexao.request("POST", f"/{operacao}", corpo, {"Content-Type": "application/json"})
+                resposta = self.conexao.getresponse()
+                dados = json.loads(resposta.read())
+                break
+            except (ConnectionError, http.client.HTTPException):
+                # Conexao caiu (servidor reiniciado): reconecta uma vez, mas nunca repete uma escrita.
+                self.fechar()
+                if tentativa or operacao in ESCRITAS:
+                    raise
+        if resposta.status != 200:
+            raise ErroServidor(resposta.status, dados.get("erro", resposta.reason))
+        return dados
+
+    def chamar(self, operacao, *args, **kwargs):
+        inicio = time.perf_counter()
+        resultado = converter(operacao, self.requisitar(operacao, args, kwargs))
+        if self.instrumentacao is not None:
+            linhas = len(resultado) if isinstance(resultado, list) else None
+            self.instrumentacao.registrar_consulta(operacao, [], time.perf_counter() - inicio, linhas)
+        return resultado
+
+    def __getattr__(self, nome):
+        if nome in LEITURAS or nome in ESCRITAS:
+            return partial(self.chamar, nome)
+        # Exportacao e estatisticas leem o arquivo do banco direto: so funcionam no modo local.
+        raise AttributeError(f"{nome} nao esta disponivel pelo servidor")
+
+    def marca_alteracoes(self):
+        return self.ultima_alteracao()
+
+    def podar_alteracoes(self, manter=100000):
+        # O servidor poda a tabela Alteracao ao iniciar.
+        return 0
+
+    def importar_csv(self, tabela, caminho, tamanho_lote=1000, progresso=None):
+        colunas = Database.COLUNAS_CSV[tabela]
+        total = 0
+        inicio = time.perf_counter()
+        with open(caminho, newline="", encoding="utf-8-sig") as arquivo:
+            linhas = linhas_csv(arquivo, colunas)
+            while True:
+                lote = list(islice(linhas, tamanho_lote))
+                if not lote:
+                    break
+                total += self.inserir_muitos(tabela, lote, colunas, tamanho_lote)[0]
+                if progresso:
+                    progresso(total)
+        duracao = time.perf_counter() - inicio
+        return total, total / duracao if duracao else float(total)
+
+    def fechar(self):
+        if self.conexao is not None:
+            self.conexao.close()
+            self.conexao = None
+
+
+def converter(operacao, valor):
+    # JSON so tem listas; a interface espera tuplas nas linhas, como o sqlite3 devolve.
+    if not isinstance(valor, list):
+        return valor
+    if operacao in LINHA_UNICA:
+        return tuple(valor)
+    return [tuple(linha) if isinstance(linha, list) else linha for linha in valor]
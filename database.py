@@ -0,0 +1,1003 @@
+import csv
+import json
+import logging
+import sqlite3
+import statistics
+import sys
+import threading
+import time
+from collections import OrderedDict, defaultdict, deque
+from contextlib import contextmanager
+from functools import wraps
+from itertools import islice
+
+class QueryCache:
+    # LRU compartilhado entre conexoes; cada entrada guarda a versao das tabelas de que depende.
+    def __init__(self, max_entradas=512, max_bytes=32 * 1024 * 1024):
+        self.max_entradas = max_entradas
+        self.max_bytes = max_bytes
+        self.entradas = OrderedDict()
+        self.versoes = defaultdict(int)
+        self.bytes = 0
+        self.acertos = 0
+        self.falhas = 0
+        self.descartes = 0
+        self.lock = threading.Lock()
+
+    def invalidar(self, tabelas):
+        with self.lock:
+            for tabela in tabelas:
+                self.versoes[tabela] += 1
+
+    def obter(self, chave, tabelas, calcular):
+        with self.lock:
+            versoes = tuple(self.versoes[tabela] for tabela in tabelas)
+            entrada = self.entradas.get(chave)
+            if entrada is not None and entrada[0] == versoes:
+                self.entradas.move_to_end(chave)
+                self.acertos += 1
+                return entrada[1]
+            self.falhas += 1
+        valor = calcular()
+        tamanho = tamanho_aproximado(valor)
+        if tamanho > self.max_bytes:
+            return valor
+        with self.lock:
+            antiga = self.entradas.pop(chave, None)
+            if antiga is not None:
+                self.bytes -= antiga[2]
+            self.entradas[chave] = (versoes, valor, tamanho)
+            self.bytes += tamanho
+            while len(self.entradas) > self.max_entradas or self.bytes > self.max_bytes:
+                _, (_, _, removido) = self.entradas.popitem(last=False)
+                self.bytes -= removido
+                self.descartes += 1
+        return valor
+
+    def estatisticas(self):
+        with self.lock:
+            consultas = self.acertos + self.falhas
+            return {
+                "acertos": self.acertos,
+                "falhas": self.falhas,
+                "taxa_acerto": self.acertos / consultas if consultas else 0.0,
+                "entradas": len(self.entradas),
+                "bytes": self.bytes,
+                "descartes": self.descartes,
+            }
+
+
+def tamanho_aproximado(valor):
+    if isinstance(valor, (list, tuple)):
+        return sys.getsizeof(valor) + sum(tamanho_aproximado(item) for item in valor)
+    return sys.getsizeof(valor)
+
+
+def argumentos_nomeados(metodo, args, kwargs):
+    # Junta posicionais, nomeados e defaults num dict por nome de parametro, para que listar("Curso")
+    # e listar(tabela="Curso") caiam na mesma entrada. Le o __code__ para nao importar inspect na partida.
+    codigo = metodo.__code__
+    nomes = codigo.co_varnames[1:codigo.co_argcount]
+    padroes = metodo.__defaults__ or ()
+    valores = dict(zip(nomes[len(nomes) - len(padroes):], padroes))
+    valores.update(zip(nomes, args))
+    valores.update(kwargs)
+    return valores, args[len(nomes):]
+
+
+def leitura_em_cache(*tabelas):
+    def decorador(metodo):
+        @wraps(metodo)
+        def envolvido(self, *args, **kwargs):
+            if self.cache is None or self.conn.in_transaction:
+                return metodo(self, *args, **kwargs)
+            valores, sobra = argumentos_nomeados(metodo, args, kwargs)
+            # Listas (ids de disciplinas da interface) viram tuplas para servir de chave.
+            chave = (metodo.__name__, tuple(sorted((nome, tuple(valor) if isinstance(valor, list) else valor)
+                                                   for nome, valor in valores.items())), sobra)
+            return self.cache.obter(chave, tabelas or (valores.get("tabela"),), lambda: metodo(self, *args, **kwargs))
+        return envolvido
+    return decorador
+
+
+class Instrumentacao:
+    # Registra duracao e linhas de cada chamada ao Database e a latencia das acoes da interface.
+    def __init__(self, limite_lento_ms=100.0, arquivo_log="consultas_lentas.log", max_registros=1000):
+        self.limite_lento_ms = limite_lento_ms
+        self.consultas = deque(maxlen=max_registros)
+        self.acoes = defaultdict(lambda: deque(maxlen=max_registros))
+        self.lock = threading.Lock()
+        self.log = logging.getLogger(f"consultas_lentas.{id(self)}")
+        self.log.propagate = False
+        self.log.setLevel(logging.WARNING)
+        if arquivo_log:
+            handler = logging.FileHandler(arquivo_log, encoding="utf-8", delay=True)
+            handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+        else:
+            handler = logging.NullHandler()
+        self.log.addHandler(handler)
+
+    def registrar_consulta(self, metodo, sql, duracao, linhas):
+        duracao_ms = duracao * 1000
+        registro = {"momento": time.time(), "metodo": metodo, "sql": sql, "duracao_ms": duracao_ms, "linhas": linhas}
+        with self.lock:
+            self.consultas.append(registro)
+        if duracao_ms >= self.limite_lento_ms:
+            self.log.warning("%s %.1f ms %s linhas: %s", metodo, duracao_ms, linhas, " | ".join(sql))
+
+    def registrar_acao(self, acao, duracao):
+        with self.lock:
+            self.acoes[acao].append(duracao * 1000)
+
+    def consultas_lentas(self):
+        with self.lock:
+            return [registro for registro in self.consultas if registro["duracao_ms"] >= self.limite_lento_ms]
+
+    def resumo_acoes(self):
+        with self.lock:
+            acoes = {acao: list(duracoes) for acao, duracoes in self.acoes.items()}
+        resumo = {}
+        for acao, duracoes in sorted(acoes.items()):
+            cortes = statistics.quantiles(duracoes, n=100, method="inclusive") if len(duracoes) > 1 else duracoes * 99
+            resumo[acao] = {
+                "chamadas": len(duracoes),
+                "p50_ms": cortes[49],
+                "p95_ms": cortes[94],
+                "max_ms": max(duracoes),
+            }
+        return resumo
+
+    def exportar_json(self, caminho, extras=None):
+        with self.lock:
+            consultas = list(self.consultas)
+        dados = {
+            "limite_lento_ms": self.limite_lento_ms,
+            "acoes": self.resumo_acoes(),
+            "consultas": consultas,
+        }
+        dados.update(extras or {})
+        with open(caminho, "w", encoding="utf-8") as arquivo:
+            json.dump(dados, arquivo, indent=2, ensure_ascii=False)
+
+
+def medido(metodo):
+    @wraps(metodo)
+    def envolvido(self, *args, **kwargs):
+        if self.instrumentacao is None or self.sql_recente is not None:
+            return metodo(self, *args, **kwargs)
+        self.sql_recente = []
+        inicio = time.perf_counter()
+        try:
+            resultado = metodo(self, *args, **kwargs)
+        finally:
+            duracao = time.perf_counter() - inicio
+            sql, self.sql_recente = self.sql_recente, None
+        linhas = len(resultado) if isinstance(resultado, list) else None
+        self.instrumentacao.registrar_consulta(metodo.__name__, sql, duracao, linhas)
+        return resultado
+    return envolvido
+
+
+def converter_campo_csv(coluna, valor):
+    # Campo vazio vira NULL; ids e notas entram como numeros, nunca como TEXT nas colunas numericas.
+    if valor == "":
+        return None
+    if coluna == "nota":
+        return float(valor)
+    if coluna == "id" or coluna.endswith("_id"):
+        return int(valor)
+    return valor
+
+
+def linhas_csv(arquivo, colunas):
+    leitor = csv.reader(arquivo)
+    cabecalho = [campo.strip() for campo in next(leitor)]
+    posicoes = [cabecalho.index(coluna) for coluna in colunas]
+    for linha in leitor:
+        if not linha:
+            continue
+        try:
+            yield tuple(converter_campo_csv(coluna, linha[i].strip()) for coluna, i in zip(colunas, posicoes))
+        except ValueError as erro:
+            raise ValueError(f"linha {leitor.line_num}: {erro}") from None
+
+
+# Corpos dos triggers que mantem ResumoDisciplina/ResumoAluno; {resumo} e {chave} sao preenchidos na migracao.
+RESUMO_ADICIONAR = """
+    INSERT INTO {resumo} ({chave}, quantidade, soma, soma_quadrados, minimo, maximo)
+    VALUES (new.{chave}, 1, new.nota, new.nota * new.nota, new.nota, new.nota)
+    ON CONFLICT ({chave}) DO UPDATE SET
+        quantidade = quantidade + 1,
+        soma = soma + excluded.soma,
+        soma_quadrados = soma_quadrados + excluded.soma_quadrados,
+        minimo = MIN(minimo, excluded.minimo),
+        maximo = MAX(maximo, excluded.maximo);
+"""
+
+RESUMO_REMOVER = """
+    UPDATE {resumo} SET
+        quantidade = quantidade - 1,
+        soma = soma - old.nota,
+        soma_quadrados = soma_quadrados - old.nota * old.nota,
+        minimo = CASE WHEN old.nota <= minimo
+            THEN (SELECT MIN(nota) FROM Nota WHERE {chave} = old.{chave}) ELSE minimo END,
+        maximo = CASE WHEN old.nota >= maximo
+            THEN (SELECT MAX(nota) FROM Nota WHERE {chave} = old.{chave}) ELSE maximo END
+    WHERE {chave} = old.{chave};
+    DELETE FROM {resumo} WHERE {chave} = old.{chave} AND quantidade <= 0;
+"""
+
+RESUMO_RECONSTRUIR = """
+    INSERT OR REPLACE INTO {resumo} ({chave}, quantidade, soma, soma_quadrados, minimo, maximo)
+    SELECT {chave}, COUNT(*), SUM(nota), SUM(nota * nota), MIN(nota), MAX(nota) FROM Nota
+    WHERE nota IS NOT NULL AND {chave} IS NOT NULL
+    GROUP BY {chave}
+"""
+
+# Tabelas filhas de cada tabela, com a coluna que aponta para ela: remover o pai remove os filhos.
+CASCATA = {
+    "Curso": (("Disciplina", "curso_id"), ("Professor", "curso_id"), ("Aluno", "curso_id")),
+    "Disciplina": (("Professor", "disciplina_id"), ("Matricula", "disciplina_id"), ("Nota", "disciplina_id")),
+    "Aluno": (("Matricula", "aluno_id"), ("Nota", "aluno_id")),
+}
+
+
+# Id da nota que fica no par (aluno_id, disciplina_id) da linha corrente de Nota.
+NOTA_MANTIDA = """
+    SELECT mantida.id FROM Nota AS mantida
+    WHERE mantida.aluno_id = Nota.aluno_id AND mantida.disciplina_id = Nota.disciplina_id
+    ORDER BY mantida.nota IS NOT NULL DESC, mantida.id DESC
+    LIMIT 1
+"""
+
+
+class Database:
+    # Cada entrada e uma versao do schema; PRAGMA user_version guarda quantas ja foram aplicadas.
+    MIGRACOES = [
+        [
+            "CREATE INDEX IF NOT EXISTS idx_disciplina_curso ON Disciplina (curso_id)",
+            "CREATE INDEX IF NOT EXISTS idx_professor_curso ON Professor (curso_id)",
+            "CREATE INDEX IF NOT EXISTS idx_professor_disciplina ON Professor (disciplina_id)",
+            "CREATE INDEX IF NOT EXISTS idx_aluno_curso ON Aluno (curso_id)",
+            "CREATE INDEX IF NOT EXISTS idx_matricula_disciplina ON Matricula (disciplina_id, aluno_id)",
+            "CREATE INDEX IF NOT EXISTS idx_nota_disciplina ON Nota (disciplina_id, aluno_id, nota)",
+            "CREATE INDEX IF NOT EXISTS idx_nota_aluno ON Nota (aluno_id, disciplina_id)",
+        ],
+        [
+            comando
+            for tabela in ("Curso", "Disciplina", "Professor", "Aluno")
+            for comando in (
+                f"""CREATE VIRTUAL TABLE IF NOT EXISTS {tabela}_busca USING fts5(
+                    nome, content='{tabela}', content_rowid='id',
+                    tokenize='unicode61 remove_diacritics 2', prefix='2 3')""",
+                f"""CREATE TRIGGER IF NOT EXISTS {tabela}_busca_ai AFTER INSERT ON {tabela} BEGIN
+                    INSERT INTO {tabela}_busca (rowid, nome) VALUES (new.id, new.nome);
+                END""",
+                f"""CREATE TRIGGER IF NOT EXISTS {tabela}_busca_ad AFTER DELETE ON {tabela} BEGIN
+                    INSERT INTO {tabela}_busca ({tabela}_busca, rowid, nome) VALUES ('delete', old.id, old.nome);
+                END""",
+                f"""CREATE TRIGGER IF NOT EXISTS {tabela}_busca_au AFTER UPDATE OF nome ON {tabela} BEGIN
+                    INSERT INTO {tabela}_busca ({tabela}_busca, rowid, nome) VALUES ('delete', old.id, old.nome);
+                    INSERT INTO {tabela}_busca (rowid, nome) VALUES (new.id, new.nome);
+                END""",
+                f"INSERT INTO {tabela}_busca ({tabela}_busca) VALUES ('rebuild')",
+            )
+        ],
+        [
+            comando
+            for resumo, chave in (("ResumoDisciplina", "disciplina_id"), ("ResumoAluno", "aluno_id"))
+            for comando in (
+                f"""CREATE TABLE IF NOT EXISTS {resumo} (
+                    {chave} INTEGER PRIMARY KEY,
+                    quantidade INTEGER NOT NULL,
+                    soma REAL NOT NULL,
+                    soma_quadrados REAL NOT NULL,
+                    minimo REAL,
+                    maximo REAL
+                )""",
+                f"""CREATE TRIGGER IF NOT EXISTS {resumo}_ai AFTER INSERT ON Nota
+                WHEN new.nota IS NOT NULL AND new.{chave} IS NOT NULL BEGIN
+                    {RESUMO_ADICIONAR.format(resumo=resumo, chave=chave)}
+                END""",
+                f"""CREATE TRIGGER IF NOT EXISTS {resumo}_ad AFTER DELETE ON Nota
+                WHEN old.nota IS NOT NULL AND old.{chave} IS NOT NULL BEGIN
+                    {RESUMO_REMOVER.format(resumo=resumo, chave=chave)}
+                END""",
+                f"""CREATE TRIGGER IF NOT EXISTS {resumo}_au_old AFTER UPDATE OF nota, {chave} ON Nota
+                WHEN old.nota IS NOT NULL AND old.{chave} IS NOT NULL BEGIN
+                    {RESUMO_REMOVER.format(resumo=resumo, chave=chave)}
+                END""",
+                f"""CREATE TRIGGER IF NOT EXISTS {resumo}_au_new AFTER UPDATE OF nota, {chave} ON Nota
+                WHEN new.nota IS NOT NULL AND new.{chave} IS NOT NULL BEGIN
+                    {RESUMO_ADICIONAR.format(resumo=resumo, chave=chave)}
+                END""",
+                RESUMO_RECONSTRUIR.format(resumo=resumo, chave=chave),
+            )
+        ],
+        [
+            """CREATE TABLE IF NOT EXISTS Alteracao (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                tabela TEXT NOT NULL,
+                registro_id INTEGER,
+                operacao TEXT NOT NULL
+            )""",
+        ] + [
+            f"""CREATE TRIGGER IF NOT EXISTS {tabela}_alteracao_{sufixo} AFTER {evento} ON {tabela} BEGIN
+                INSERT INTO Alteracao (tabela, registro_id, operacao) VALUES ('{tabela}', {linha}.{chave}, '{operacao}');
+            END"""
+            for tabela, chave in (("Curso", "id"), ("Disciplina", "id"), ("Professor", "id"), ("Aluno", "id"),
+                                  ("Nota", "id"), ("Matricula", "aluno_id"))
+            for sufixo, evento, linha, operacao in (("ai", "INSERT", "new", "I"), ("au", "UPDATE", "new", "U"),
+                                                    ("ad", "DELETE", "old", "D"))
+        ],
+        # ON DELETE CASCADE por triggers: as FOREIGN KEY ja existem e o SQLite nao as altera sem
+        # recriar as tabelas (e os triggers de busca, resumo e alteracoes ligados a elas).
+        [
+            f"""CREATE TRIGGER IF NOT EXISTS {pai}_cascata_ad AFTER DELETE ON {pai} BEGIN
+                {" ".join(f"DELETE FROM {filho} WHERE {coluna} = old.id;" for filho, coluna in filhos)}
+            END"""
+            for pai, filhos in CASCATA.items()
+        ],
+        # Uma nota por aluno e disciplina: de cada par repetido fica a mais recente (maior id) com nota,
+        # ou a mais recente de todas se nenhuma tiver; as removidas ficam guardadas em NotaDuplicada.
+        [
+            """CREATE TABLE IF NOT EXISTS NotaDuplicada (
+                nota_id INTEGER PRIMARY KEY,
+                aluno_id INTEGER,
+                disciplina_id INTEGER,
+                nota REAL,
+                mantida_id INTEGER NOT NULL,
+                momento TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+            )""",
+            f"""INSERT INTO NotaDuplicada (nota_id, aluno_id, disciplina_id, nota, mantida_id)
+            SELECT id, aluno_id, disciplina_id, nota, mantida_id FROM (
+                SELECT Nota.*, ({NOTA_MANTIDA}) AS mantida_id FROM Nota
+            ) WHERE id <> mantida_id""",
+            f"DELETE FROM Nota WHERE id <> ({NOTA_MANTIDA})",
+            "DROP INDEX IF EXISTS idx_nota_aluno",
+            "CREATE UNIQUE INDEX IF NOT EXISTS idx_nota_aluno ON Nota (aluno_id, disciplina_id)",
+            """CREATE TABLE IF NOT EXISTS Reajuste (
+                id INTEGER PRIMARY KEY,
+                disciplina_id INTEGER NOT NULL,
+                fator REAL NOT NULL,
+                acrescimo REAL NOT NULL,
+                momento TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+            )""",
+            """CREATE TABLE IF NOT EXISTS AuditoriaNota (
+                reajuste_id INTEGER NOT NULL,
+                nota_id INTEGER NOT NULL,
+                nota_anterior REAL,
+                nota_nova REAL,
+                PRIMARY KEY (reajuste_id, nota_id),
+                FOREIGN KEY (reajuste_id) REFERENCES Reajuste(id)
+            )""",
+        ],
+    ]
+
+    SQL_NOTAS_POR_DISCIPLINA = """
+        SELECT Aluno.nome, Nota.nota FROM Nota
+        JOIN Aluno ON Nota.aluno_id = Aluno.id
+        WHERE Nota.disciplina_id = ?
+        """
+
+    SQL_ALUNOS_POR_DISCIPLINA = """
+        SELECT Aluno.id, Aluno.nome FROM Aluno
+        JOIN Matricula ON Aluno.id = Matricula.aluno_id
+        WHERE Matricula.disciplina_id = ?
+        """
+
+    SQL_DISCIPLINAS_POR_CURSO = "SELECT * FROM Disciplina WHERE curso_id = ?"
+    SQL_PROFESSORES_POR_DISCIPLINA = "SELECT * FROM Professor WHERE disciplina_id = ?"
+    SQL_PROFESSORES_POR_CURSO = "SELECT * FROM Professor WHERE curso_id = ?"
+    SQL_MATRICULA_EXISTE = "SELECT COUNT(*) FROM Matricula WHERE aluno_id = ? AND disciplina_id = ?"
+
+    # Nova nota de um reajuste: nota * fator + acrescimo, limitada a [0, nota_maxima].
+    SQL_NOTA_REAJUSTADA = "ROUND(MIN(:nota_maxima, MAX(0, nota * :fator + :acrescimo)), 2)"
+
+    # Clausula de conflito por tabela nas insercoes: reenviar a nota de um aluno numa disciplina a substitui.
+    CONFLITO = {
+        "Nota": "ON CONFLICT (aluno_id, disciplina_id) DO UPDATE SET nota = excluded.nota",
+    }
+
+    COLUNAS_CSV = {
+        "Aluno": ("nome", "curso_id"),
+        "Matricula": ("aluno_id", "disciplina_id"),
+        "Nota": ("aluno_id", "disciplina_id", "nota"),
+    }
+
+    MAX_SQL_RASTREADO = 20
+
+    PERFIL_DESEMPENHO = [
+        "PRAGMA journal_mode = WAL",
+        "PRAGMA synchronous = NORMAL",
+        "PRAGMA cache_size = -65536",
+        "PRAGMA mmap_size = 268435456",
+        "PRAGMA temp_store = MEMORY",
+    ]
+
+    def __init__(self, caminho="university.db", desempenho=False, cache=None, instrumentacao=None, somente_leitura=False):
+        self.caminho = caminho
+        self.desempenho = desempenho
+        self.cache = cache
+        self.instrumentacao = instrumentacao
+        self.sql_recente = None
+        self.tabelas_alteradas = set()
+        if somente_leitura:
+            self.conn = sqlite3.connect(f"file:{caminho}?mode=ro", uri=True)
+        else:
+            self.conn = sqlite3.connect(caminho)
+        self.conn.execute("PRAGMA foreign_keys = ON")
+        if instrumentacao is not None:
+            self.conn.set_trace_callback(self.rastrear)
+        self.nivel_transacao = 0
+        if desempenho:
+            self.aplicar_perfil_desempenho()
+        if not somente_leitura:
+            self.create_tables()
+            self.migrar()
+
+    def rastrear(self, sql):
+        # Ignora subcomandos de triggers/FTS ("-- ...") e repeticoes do mesmo comando.
+        sql = sql.strip()
+        if self.sql_recente is None or sql.startswith("--") or len(self.sql_recente) >= self.MAX_SQL_RASTREADO:
+            return
+        if not self.sql_recente or self.sql_recente[-1] != sql:
+            self.sql_recente.append(sql)
+
+    def aplicar_perfil_desempenho(self):
+        for pragma in self.PERFIL_DESEMPENHO:
+            self.conn.execute(pragma)
+
+    @contextmanager
+    def transacao(self):
+        savepoint = f"sp_{self.nivel_transacao}"
+        if self.nivel_transacao == 0:
+            if not self.conn.in_transaction:
+                self.conn.execute("BEGIN")
+        else:
+            self.conn.execute(f"SAVEPOINT {savepoint}")
+        self.nivel_transacao += 1
+        try:
+            yield self
+        except BaseException:
+            self.nivel_transacao -= 1
+            if self.nivel_transacao == 0:
+                self.conn.rollback()
+                self.publicar_alteracoes()
+            else:
+                self.conn.execute(f"ROLLBACK TO {savepoint}")
+                self.conn.execute(f"RELEASE {savepoint}")
+            raise
+        self.nivel_transacao -= 1
+        if self.nivel_transacao == 0:
+            self.conn.commit()
+            self.publicar_alteracoes()
+        else:
+            self.conn.execute(f"RELEASE {savepoint}")
+
+    def confirmar(self):
+        if self.nivel_transacao == 0:
+            self.conn.commit()
+            self.publicar_alteracoes()
+
+    def marcar_alteracao(self, *tabelas):
+        self.tabelas_alteradas.update(tabelas)
+
+    def publicar_alteracoes(self):
+        if self.cache is not None and self.tabelas_alteradas:
+            self.cache.invalidar(self.tabelas_alteradas)
+        self.tabelas_alteradas = set()
+
+    def fechar(self):
+        self.conn.close()
+
+    def create_tables(self):
+        cursor = self.conn.cursor()
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS Curso (
+            id INTEGER PRIMARY KEY,
+            nome TEXT NOT NULL
+        )""")
+        
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS Disciplina (
+            id INTEGER PRIMARY KEY,
+            nome TEXT NOT NULL,
+            curso_id INTEGER,
+            FOREIGN KEY (curso_id) REFERENCES Curso(id)
+        )""")
+        
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS Professor (
+            id INTEGER PRIMARY KEY,
+            nome TEXT NOT NULL,
+            curso_id INTEGER,
+            disciplina_id INTEGER,
+            FOREIGN KEY (curso_id) REFERENCES Curso(id),
+            FOREIGN KEY (disciplina_id) REFERENCES Disciplina(id)
+        )""")
+        
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS Aluno (
+            id INTEGER PRIMARY KEY,
+            nome TEXT NOT NULL,
+            curso_id INTEGER,
+            FOREIGN KEY (curso_id) REFERENCES Curso(id)
+        )""")
+
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS Matricula (
+            aluno_id INTEGER,
+            disciplina_id INTEGER,
+            PRIMARY KEY (aluno_id, disciplina_id),
+            FOREIGN KEY (aluno_id) REFERENCES Aluno(id),
+            FOREIGN KEY (disciplina_id) REFERENCES Disciplina(id)
+        )""")
+        
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS Nota (
+            id INTEGER PRIMARY KEY,
+            aluno_id INTEGER,
+            disciplina_id INTEGER,
+            nota REAL,
+            FOREIGN KEY (aluno_id) REFERENCES Aluno(id),
+            FOREIGN KEY (disciplina_id) REFERENCES Disciplina(id)
+        )""")
+        
+        self.conn.commit()
+
+    def versao_schema(self):
+        return self.conn.execute("PRAGMA user_version").fetchone()[0]
+
+    def migrar(self):
+        versao = self.versao_schema()
+        for numero, comandos in enumerate(self.MIGRACOES[versao:], start=versao + 1):
+            cursor = self.conn.cursor()
+            for comando in comandos:
+                cursor.execute(comando)
+            cursor.execute(f"PRAGMA user_version = {numero}")
+            self.conn.commit()
+        if versao < len(self.MIGRACOES):
+            self.conn.execute("ANALYZE")
+
+    def reconstruir_resumos(self):
+        with self.transacao():
+            cursor = self.conn.cursor()
+            for resumo, chave in (("ResumoDisciplina", "disciplina_id"), ("ResumoAluno", "aluno_id")):
+                cursor.execute(f"DELETE FROM {resumo}")
+                cursor.execute(RESUMO_RECONSTRUIR.format(resumo=resumo, chave=chave))
+
+    def versao_dados(self):
+        return self.conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def marca_alteracoes(self):
+        return self.versao_dados(), self.conn.total_changes
+
+    def ultima_alteracao(self):
+        cursor = self.conn.cursor()
+        cursor.execute("SELECT COALESCE(MAX(seq), 0) FROM Alteracao")
+        return cursor.fetchone()[0]
+
+    def listar_alteracoes(self, apos_seq, limite=10000):
+        cursor = self.conn.cursor()
+        cursor.execute("SELECT seq, tabela, registro_id, operacao FROM Alteracao WHERE seq > ? ORDER BY seq LIMIT ?",
+                       (apos_seq, limite))
+        return cursor.fetchall()
+
+    def tabelas_com_alteracoes(self, apos_seq, ate_seq):
+        cursor = self.conn.cursor()
+        cursor.execute("SELECT DISTINCT tabela FROM Alteracao WHERE seq > ? AND seq <= ?", (apos_seq, ate_seq))
+        return [tabela for tabela, in cursor.fetchall()]
+
+    def podar_alteracoes(self, manter=100000):
+        cursor = self.conn.cursor()
+        cursor.execute("DELETE FROM Alteracao WHERE seq <= (SELECT MAX(seq) FROM Alteracao) - ?", (manter,))
+        self.confirmar()
+
+    def consultas_indexadas(self):
+        return {
+            "listar_notas_por_disciplina": (self.SQL_NOTAS_POR_DISCIPLINA, (1,)),
+            "listar_disciplinas_por_curso": (self.SQL_DISCIPLINAS_POR_CURSO, (1,)),
+            "listar_alunos_por_disciplina": (self.SQL_ALUNOS_POR_DISCIPLINA, (1,)),
+            "listar_professores_por_disciplina": (self.SQL_PROFESSORES_POR_DISCIPLINA, (1,)),
+            "listar_professores_por_curso": (self.SQL_PROFESSORES_POR_CURSO, (1,)),
+            "matricula_existe": (self.SQL_MATRICULA_EXISTE, (1, 1)),
+        }
+
+    def verificar_indices(self):
+        sem_indice = []
+        for metodo, (sql, parametros) in self.consultas_indexadas().items():
+            plano = self.conn.execute(f"EXPLAIN QUERY PLAN {sql}", parametros).fetchall()
+            for linha in plano:
+                detalhe = linha[-1]
+                if detalhe.startswith("SCAN"):
+                    sem_indice.append(f"{metodo}: {detalhe}")
+        assert not sem_indice, "Consultas sem indice:\n" + "\n".join(sem_indice)
+        return True
+
+    @medido
+    def inserir_nota(self, aluno_id, disciplina_id, nota):
+        cursor = self.conn.cursor()
+        cursor.execute(f"INSERT INTO Nota (aluno_id, disciplina_id, nota) VALUES (?, ?, ?) {self.CONFLITO['Nota']}",
+                       (aluno_id, disciplina_id, nota))
+        self.marcar_alteracao("Nota")
+        self.confirmar()
+
+    @medido
+    def reajustar_notas(self, disciplina_id, fator=1.0, acrescimo=0.0, nota_maxima=10.0):
+        # Um UPDATE para a disciplina inteira; as notas anteriores ficam em AuditoriaNota.
+        parametros = {"disciplina_id": disciplina_id, "fator": fator, "acrescimo": acrescimo, "nota_maxima": nota_maxima}
+        with self.transacao():
+            cursor = self.conn.cursor()
+            cursor.execute("INSERT INTO Reajuste (disciplina_id, fator, acrescimo) VALUES (?, ?, ?)",
+                           (disciplina_id, fator, acrescimo))
+            parametros["reajuste_id"] = cursor.lastrowid
+            cursor.execute(f"""
+            INSERT INTO AuditoriaNota (reajuste_id, nota_id, nota_anterior, nota_nova)
+            SELECT :reajuste_id, id, nota, {self.SQL_NOTA_REAJUSTADA} FROM Nota
+            WHERE disciplina_id = :disciplina_id AND nota IS NOT NULL
+            """, parametros)
+            cursor.execute(f"""
+            UPDATE Nota SET nota = {self.SQL_NOTA_REAJUSTADA}
+            WHERE disciplina_id = :disciplina_id AND nota IS NOT NULL
+            """, parametros)
+            alteradas = cursor.rowcount
+            self.marcar_alteracao("Nota")
+        return {"reajuste": parametros["reajuste_id"], "notas": alteradas}
+
+    @medido
+    def desfazer_reajuste(self, reajuste_id):
+        with self.transacao():
+            cursor = self.conn.cursor()
+            cursor.execute("""
+            UPDATE Nota SET nota = AuditoriaNota.nota_anterior FROM AuditoriaNota
+            WHERE AuditoriaNota.reajuste_id = ? AND Nota.id = AuditoriaNota.nota_id
+            """, (reajuste_id,))
+            restauradas = cursor.rowcount
+            self.marcar_alteracao("Nota")
+        return restauradas
+
+    @medido
+    @leitura_em_cache("Nota", "Aluno")
+    def listar_notas_por_disciplina(self, disciplina_id):
+        cursor = self.conn.cursor()
+        cursor.execute(self.SQL_NOTAS_POR_DISCIPLINA, (disciplina_id,))
+        return cursor.fetchall()
+
+    @medido
+    def inserir(self, tabela, valores):
+        cursor = self.conn.cursor()
+        placeholders = ', '.join(['?'] * len(valores))
+        conflito = self.CONFLITO.get(tabela)
+        if conflito:
+            # No upsert que vira UPDATE o lastrowid nao muda: o id vem do RETURNING.
+            cursor.execute(f"INSERT INTO {tabela} VALUES ({placeholders}) {conflito} RETURNING rowid", valores)
+            id = cursor.fetchone()[0]
+        else:
+            cursor.execute(f"INSERT INTO {tabela} VALUES ({placeholders})", valores)
+            id = cursor.lastrowid
+        self.marcar_alteracao(tabela)
+        self.confirmar()
+        return id
+
+    @medido
+    def inserir_muitos(self, tabela, linhas, colunas=None, tamanho_lote=1000, progresso=None):
+        linhas = iter(linhas)
+        lote = list(islice(linhas, tamanho_lote))
+        if not lote:
+            return 0, 0.0
+        placeholders = ', '.join(['?'] * len(lote[0]))
+        destino = f"{tabela} ({', '.join(colunas)})" if colunas else tabela
+        sql = f"INSERT INTO {destino} VALUES ({placeholders}) {self.CONFLITO.get(tabela, '')}"
+        total = 0
+        inicio = time.perf_counter()
+        cursor = self.conn.cursor()
+        with self.transacao():
+            self.marcar_alteracao(tabela)
+            while lote:
+                cursor.executemany(sql, lote)
+                total += len(lote)
+                if progresso:
+                    progresso(total)
+                lote = list(islice(linhas, tamanho_lote))
+        duracao = time.perf_counter() - inicio
+        return total, total / duracao if duracao else float(total)
+
+    @medido
+    def importar_csv(self, tabela, caminho, tamanho_lote=1000, progresso=None):
+        colunas = self.COLUNAS_CSV[tabela]
+        # utf-8-sig: o "CSV UTF-8" do Excel comeca com BOM, que estragaria o nome da primeira coluna.
+        with open(caminho, newline="", encoding="utf-8-sig") as arquivo:
+            return self.inserir_muitos(tabela, linhas_csv(arquivo, colunas), colunas, tamanho_lote, progresso)
+
+    @medido
+    def remover(self, tabela, id):
+        cursor = self.conn.cursor()
+        cursor.execute(f"DELETE FROM {tabela} WHERE id = ?", (id,))
+        self.marcar_alteracao(*self.tabelas_em_cascata(tabela))
+        self.confirmar()
+
+    @medido
+    def remover_muitos(self, tabela, ids):
+        with self.transacao():
+            cursor = self.conn.cursor()
+            cursor.executemany(f"DELETE FROM {tabela} WHERE id = ?", ((id,) for id in ids))
+            self.marcar_alteracao(*self.tabelas_em_cascata(tabela))
+        return cursor.rowcount
+
+    def tabelas_em_cascata(self, tabela):
+        tabelas = [tabela]
+        for atual in tabelas:
+            tabelas.extend(filho for filho, _ in CASCATA.get(atual, ()) if filho not in tabelas)
+        return tabelas
+
+    def limpar_orfaos(self):
+        # Pais antes dos filhos: as remocoes de um nivel ja propagam para os niveis seguintes.
+        # O rowcount nao inclui o que os triggers de cascata apagam, entao conta cada tabela antes e depois.
+        tabelas = list(dict.fromkeys(filho for filhos in CASCATA.values() for filho, _ in filhos))
+        with self.transacao():
+            cursor = self.conn.cursor()
+            antes = {tabela: cursor.execute(f"SELECT COUNT(*) FROM {tabela}").fetchone()[0] for tabela in tabelas}
+            for pai, filhos in CASCATA.items():
+                for filho, coluna in filhos:
+                    cursor.execute(f"""
+                    DELETE FROM {filho} WHERE {coluna} IS NOT NULL
+                    AND NOT EXISTS (SELECT 1 FROM {pai} WHERE {pai}.id = {filho}.{coluna})
+                    """)
+                    if cursor.rowcount:
+                        self.marcar_alteracao(*self.tabelas_em_cascata(filho))
+            return {tabela: antes[tabela] - cursor.execute(f"SELECT COUNT(*) FROM {tabela}").fetchone()[0]
+                    for tabela in tabelas}
+
+    def tamanho_banco(self):
+        pagina = self.conn.execute("PRAGMA page_size").fetchone()[0]
+        return self.conn.execute("PRAGMA page_count").fetchone()[0] * pagina
+
+    def manutencao(self):
+        antes = self.tamanho_banco()
+        orfaos = self.limpar_orfaos()
+        self.conn.execute("ANALYZE")
+        self.conn.execute("VACUUM")
+        depois = self.tamanho_banco()
+        return {"orfaos": orfaos, "bytes_antes": antes, "bytes_depois": depois, "recuperados": antes - depois}
+
+    @medido
+    def atualizar(self, tabela, coluna, valor, id):
+        cursor = self.conn.cursor()
+        cursor.execute(f"UPDATE {tabela} SET {coluna} = ? WHERE id = ?", (valor, id))
+        self.marcar_alteracao(tabela)
+        self.confirmar()
+
+    @medido
+    @leitura_em_cache()
+    def listar(self, tabela):
+        cursor = self.conn.cursor()
+        cursor.execute(f"SELECT * FROM {tabela}")
+        return cursor.fetchall()
+
+    @medido
+    @leitura_em_cache()
+    def listar_pagina(self, tabela, apos_id=None, antes_id=None, limite=50):
+        cursor = self.conn.cursor()
+        if antes_id is not None:
+            cursor.execute(f"SELECT * FROM {tabela} WHERE id < ? ORDER BY id DESC LIMIT ?", (antes_id, limite))
+            return cursor.fetchall()[::-1]
+        cursor.execute(f"SELECT * FROM {tabela} WHERE id > ? ORDER BY id LIMIT ?", (apos_id if apos_id is not None else -1, limite))
+        return cursor.fetchall()
+
+    @medido
+    @leitura_em_cache()
+    def contar(self, tabela):
+        cursor = self.conn.cursor()
+        cursor.execute(f"SELECT COUNT(*) FROM {tabela}")
+        return cursor.fetchone()[0]
+
+    @medido
+    @leitura_em_cache()
+    def intervalo_ids(self, tabela):
+        cursor = self.conn.cursor()
+        cursor.execute(f"SELECT MIN(id), MAX(id) FROM {tabela}")
+        return cursor.fetchone()
+
+    @medido
+    @leitura_em_cache()
+    def buscar(self, tabela, termo, limite=20):
+        termos = [f'"{parte.replace(chr(34), chr(34) * 2)}"*' for parte in termo.split()]
+        if not termos:
+            return []
+        cursor = self.conn.cursor()
+        cursor.execute(f"""
+        SELECT {tabela}.* FROM {tabela}_busca
+        JOIN {tabela} ON {tabela}.id = {tabela}_busca.rowid
+        WHERE {tabela}_busca MATCH ?
+        ORDER BY rank
+        LIMIT ?
+        """, (" ".join(termos), limite))
+        return cursor.fetchall()
+
+    def ler_resumo(self, resumo, chave, id):
+        cursor = self.conn.cursor()
+        cursor.execute(f"SELECT quantidade, soma, soma_quadrados, minimo, maximo FROM {resumo} WHERE {chave} = ?", (id,))
+        linha = cursor.fetchone()
+        if linha is None:
+            return None
+        quantidade, soma, soma_quadrados, minimo, maximo = linha
+        media = soma / quantidade
+        variancia = max(soma_quadrados / quantidade - media * media, 0.0)
+        return {
+            "quantidade": quantidade,
+            "media": media,
+            "variancia": variancia,
+            "desvio": variancia ** 0.5,
+            "minimo": minimo,
+            "maximo": maximo,
+        }
+
+    @medido
+    def resumo_disciplina(self, disciplina_id):
+        return self.ler_resumo("ResumoDisciplina", "disciplina_id", disciplina_id)
+
+    @medido
+    def resumo_aluno(self, aluno_id):
+        return self.ler_resumo("ResumoAluno", "aluno_id", aluno_id)
+
+    @medido
+    def coeficiente_rendimento(self, aluno_id):
+        resumo = self.ler_resumo("ResumoAluno", "aluno_id", aluno_id)
+        return resumo["media"] if resumo else None
+
+    @medido
+    @leitura_em_cache()
+    def obter(self, tabela, id):
+        cursor = self.conn.cursor()
+        cursor.execute(f"SELECT * FROM {tabela} WHERE id = ?", (id,))
+        return cursor.fetchone()
+
+    def em_wal(self):
+        return self.conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+    def iterar(self, sql, parametros=(), tamanho_lote=1000, chave=None):
+        # Em WAL, um cursor so: le um snapshot e nao bloqueia ninguem. No journal padrao, um cursor aberto
+        # segura o lock SHARED e trava as escritas das outras conexoes; com uma chave (colunas unicas do
+        # resultado), le em paginas por keyset, cada uma numa consulta curta, soltando o lock entre elas.
+        if chave is None or self.em_wal():
+            cursor = self.conn.cursor()
+            cursor.execute(sql, parametros)
+            colunas = [descricao[0] for descricao in cursor.description]
+
+            def linhas():
+                while True:
+                    lote = cursor.fetchmany(tamanho_lote)
+                    if not lote:
+                        return
+                    yield from lote
+            return colunas, linhas()
+
+        ordem = ", ".join(chave)
+        cursor = self.conn.execute(f"SELECT * FROM ({sql}) ORDER BY {ordem} LIMIT ?", (*parametros, tamanho_lote))
+        colunas = [descricao[0] for descricao in cursor.description]
+        posicoes = [colunas.index(coluna) for coluna in chave]
+        proxima = f"""
+        SELECT * FROM ({sql}) WHERE ({ordem}) > ({', '.join(['?'] * len(chave))}) ORDER BY {ordem} LIMIT ?
+        """
+
+        def paginas(lote):
+            while lote:
+                yield from lote
+                if len(lote) < tamanho_lote:
+                    return
+                ultima = [lote[-1][i] for i in posicoes]
+                lote = self.conn.execute(proxima, (*parametros, *ultima, tamanho_lote)).fetchall()
+        return colunas, paginas(cursor.fetchall())
+
+    def iterar_tabela(self, tabela, tamanho_lote=1000):
+        chave = ("aluno_id", "disciplina_id") if tabela == "Matricula" else ("id",)
+        return self.iterar(f"SELECT * FROM {tabela}", (), tamanho_lote, chave)
+
+    def iterar_notas_por_disciplina(self, disciplina_id, tamanho_lote=1000):
+        return self.iterar("""
+        SELECT Aluno.id AS aluno_id, Aluno.nome AS aluno, Nota.nota FROM Nota
+        JOIN Aluno ON Nota.aluno_id = Aluno.id
+        WHERE Nota.disciplina_id = ?
+        """, (disciplina_id,), tamanho_lote, ("aluno_id",))
+
+    def iterar_alunos_por_curso(self, curso_id, tamanho_lote=1000):
+        return self.iterar("SELECT id, nome FROM Aluno WHERE curso_id = ?", (curso_id,), tamanho_lote, ("id",))
+
+    def iterar_historico_aluno(self, aluno_id, tamanho_lote=1000):
+        return self.iterar("""
+        SELECT Disciplina.id AS disciplina_id, Disciplina.nome AS disciplina, Nota.nota FROM Nota
+        JOIN Disciplina ON Nota.disciplina_id = Disciplina.id
+        WHERE Nota.aluno_id = ?
+        """, (aluno_id,), tamanho_lote, ("disciplina_id",))
+
+    @medido
+    @leitura_em_cache("Disciplina")
+    def listar_disciplinas_por_curso(self, curso_id):
+        cursor = self.conn.cursor()
+        cursor.execute(self.SQL_DISCIPLINAS_POR_CURSO, (curso_id,))
+        return cursor.fetchall()
+
+    @medido
+    @leitura_em_cache("Aluno", "Matricula")
+    def listar_alunos_por_disciplina(self, disciplina_id):
+        cursor = self.conn.cursor()
+        cursor.execute(self.SQL_ALUNOS_POR_DISCIPLINA, (disciplina_id,))
+        return cursor.fetchall()
+
+    @medido
+    @leitura_em_cache("Professor")
+    def listar_professores_por_disciplina(self, disciplina_id):
+        cursor = self.conn.cursor()
+        cursor.execute(self.SQL_PROFESSORES_POR_DISCIPLINA, (disciplina_id,))
+        return cursor.fetchall()
+
+    @medido
+    @leitura_em_cache("Professor")
+    def listar_professores_por_curso(self, curso_id):
+        cursor = self.conn.cursor()
+        cursor.execute(self.SQL_PROFESSORES_POR_CURSO, (curso_id,))
+        return cursor.fetchall()
+    
+    @medido
+    @leitura_em_cache("Aluno", "Matricula", "Disciplina")
+    def previa_matricula_curso(self, curso_id, disciplina_ids):
+        disciplina_ids = sorted(set(disciplina_ids))
+        cursor = self.conn.cursor()
+        # Ids sem Disciplina fariam o matricular_curso falhar na FK: ficam fora da conta e sao listados.
+        placeholders = ', '.join(['?'] * len(disciplina_ids))
+        cursor.execute(f"SELECT id FROM Disciplina WHERE id IN ({placeholders})", disciplina_ids)
+        encontradas = {linha[0] for linha in cursor.fetchall()}
+        inexistentes = [disciplina_id for disciplina_id in disciplina_ids if disciplina_id not in encontradas]
+        disciplina_ids = sorted(encontradas)
+        cursor.execute("SELECT COUNT(*) FROM Aluno WHERE curso_id = ?", (curso_id,))
+        alunos = cursor.fetchone()[0]
+        placeholders = ', '.join(['?'] * len(disciplina_ids))
+        cursor.execute(f"""
+        SELECT COUNT(*) FROM Aluno
+        JOIN Matricula ON Matricula.aluno_id = Aluno.id
+        WHERE Aluno.curso_id = ? AND Matricula.disciplina_id IN ({placeholders})
+        """, (curso_id, *disciplina_ids))
+        existentes = cursor.fetchone()[0]
+        total = alunos * len(disciplina_ids)
+        return {"alunos": alunos, "disciplinas": len(disciplina_ids), "novas": total - existentes, "existentes": existentes,
+                "inexistentes": inexistentes}
+
+    @medido
+    def matricular(self, aluno_id, disciplina_id):
+        cursor = self.conn.cursor()
+        cursor.execute("INSERT OR IGNORE INTO Matricula (aluno_id, disciplina_id) VALUES (?, ?)", (aluno_id, disciplina_id))
+        cursor.execute("SELECT changes()")
+        inserida = cursor.fetchone()[0] > 0
+        self.marcar_alteracao("Matricula")
+        self.confirmar()
+        return inserida
+
+    @medido
+    def matricular_curso(self, curso_id, disciplina_ids):
+        disciplina_ids = sorted(set(disciplina_ids))
+        if not disciplina_ids:
+            return {"alunos": 0, "disciplinas": 0, "inseridas": 0, "existentes": 0}
+        valores = ', '.join(['(?)'] * len(disciplina_ids))
+        with self.transacao():
+            cursor = self.conn.cursor()
+            cursor.execute("SELECT COUNT(*) FROM Aluno WHERE curso_id = ?", (curso_id,))
+            alunos = cursor.fetchone()[0]
+            cursor.execute(f"""
+            WITH alvo (disciplina_id) AS (VALUES {valores})
+            INSERT OR IGNORE INTO Matricula (aluno_id, disciplina_id)
+            SELECT Aluno.id, alvo.disciplina_id FROM Aluno, alvo
+            WHERE Aluno.curso_id = ?
+            """, (*disciplina_ids, curso_id))
+            cursor.execute("SELECT changes()")
+            inseridas = cursor.fetchone()[0]
+            self.marcar_alteracao("Matricula")
+        total = alunos * len(disciplina_ids)
+        return {"alunos": alunos, "disciplinas": len(disciplina_ids), "inseridas": inseridas, "existentes": total - inseridas}
+
+    @medido
+    @leitura_em_cache("Matricula")
+    def matricula_existe(self, aluno_id, disciplina_id):
+        cursor = self.conn.cursor()
+        cursor.execute(self.SQL_MATRICULA_EXISTE, (aluno_id, disciplina_id))
+        return cursor.fetchone()[0] > 0
@@ -0,0 +1,102 @@
+import argparse
+import bz2
+import csv
+import gzip
+import json
+import lzma
+import sys
+from database import Database
+
+COMPRESSORES = {".gz": gzip.open, ".bz2": bz2.open, ".xz": lzma.open}
+TABELAS = ("Curso", "Disciplina", "Professor", "Aluno", "Matricula", "Nota")
+
+
+def abrir_saida(caminho):
+    for extensao, abrir in COMPRESSORES.items():
+        if caminho.endswith(extensao):
+            return abrir(caminho, "wt", encoding="utf-8", newline=""), caminho[:-len(extensao)]
+    return open(caminho, "w", encoding="utf-8", newline=""), caminho
+
+
+def formato_de(caminho):
+    if caminho.endswith(".jsonl") or caminho.endswith(".ndjson"):
+        return "jsonl"
+    return "csv"
+
+
+def escrever_csv(arquivo, colunas, linhas):
+    escritor = csv.writer(arquivo)
+    escritor.writerow(colunas)
+    for linha in linhas:
+        escritor.writerow(linha)
+        yield
+
+
+def escrever_jsonl(arquivo, colunas, linhas):
+    for linha in linhas:
+        arquivo.write(json.dumps(dict(zip(colunas, linha)), ensure_ascii=False))
+        arquivo.write("\n")
+        yield
+
+
+ESCRITORES = {"csv": escrever_csv, "jsonl": escrever_jsonl}
+
+
+def exportar(colunas, linhas, caminho, formato=None, progresso=None, intervalo=10000):
+    arquivo, caminho_base = abrir_saida(caminho)
+    escritas = 0
+    with arquivo:
+        for _ in ESCRITORES[formato or formato_de(caminho_base)](arquivo, colunas, linhas):
+            escritas += 1
+            if progresso and escritas % intervalo == 0:
+                progresso(escritas)
+    if progresso:
+        progresso(escritas)
+    return escritas
+
+
+def exportar_notas(db, disciplina_id, caminho, **opcoes):
+    return exportar(*db.iterar_notas_por_disciplina(disciplina_id), caminho, **opcoes)
+
+
+def exportar_alunos_curso(db, curso_id, caminho, **opcoes):
+    return exportar(*db.iterar_alunos_por_curso(curso_id), caminho, **opcoes)
+
+
+def exportar_historico(db, aluno_id, caminho, **opcoes):
+    return exportar(*db.iterar_historico_aluno(aluno_id), caminho, **opcoes)
+
+
+def exportar_tabela(db, tabela, caminho, **opcoes):
+    return exportar(*db.iterar_tabela(tabela), caminho, **opcoes)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Exporta notas, listas e tabelas em CSV ou JSON Lines (opcionalmente .gz/.bz2/.xz).")
+    parser.add_argument("--banco", default="university.db")
+    parser.add_argument("--formato", choices=sorted(ESCRITORES), help="padrao: deduzido da extensao da saida")
+    subparsers = parser.add_subparsers(dest="comando", required=True)
+    for comando, funcao, alvo, ajuda in (
+        ("notas", exportar_notas, "disciplina_id", "notas de uma disciplina"),
+        ("alunos", exportar_alunos_curso, "curso_id", "alunos de um curso"),
+        ("historico", exportar_historico, "aluno_id", "historico de um aluno"),
+    ):
+        subparser = subparsers.add_parser(comando, help=ajuda)
+        subparser.add_argument("alvo", metavar=alvo, type=int)
+        subparser.add_argument("saida")
+        subparser.set_defaults(funcao=funcao)
+    tabela = subparsers.add_parser("tabela", help="tabela completa")
+    tabela.add_argument("alvo", metavar="tabela", choices=TABELAS)
+    tabela.add_argument("saida")
+    tabela.set_defaults(funcao=exportar_tabela)
+    args = parser.parse_args()
+
+    db = Database(args.banco)
+    total = args.funcao(db, args.alvo, args.saida, formato=args.formato,
+                        progresso=lambda escritas: print(f"\r{escritas} linhas", end="", file=sys.stderr))
+    print(file=sys.stderr)
+    print(f"{total} linhas exportadas para {args.saida}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+import numpy as np
+from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+from matplotlib.figure import Figure
+
+
+class GraficoNotas:
+    # Uma unica Figure por aba: os artistas sao atualizados no lugar a cada clique.
+    LIMITE_ANOTACOES = 100
+    LIMITE_DISPERSAO = 1000
+    CLASSES_HISTOGRAMA = 20
+    CLASSES_ALUNOS = 50
+
+    def __init__(self, master, row, column, columnspan=1):
+        self.figura = Figure(figsize=(6, 4))
+        self.ax = self.figura.add_subplot()
+        self.canvas = FigureCanvasTkAgg(self.figura, master=master)
+        self.canvas.get_tk_widget().grid(row=row, column=column, columnspan=columnspan)
+        self.modo = None
+        self.anotacoes = []
+        self.caixa = {}
+
+    def atualizar(self, notas, modo="automático"):
+        # "automático": dispersao ponto a ponto ate LIMITE_DISPERSAO notas, histograma acima disso.
+        notas = [nota for nota in notas if nota[1] is not None]
+        alunos = [nota[0] for nota in notas]
+        notas_valores = np.array([nota[1] for nota in notas], dtype=float)
+        if modo == "histograma" or (modo == "automático" and len(notas_valores) > self.LIMITE_DISPERSAO):
+            self.desenhar_histograma(notas_valores)
+        elif modo == "box plot":
+            self.desenhar_boxplot(notas_valores)
+        elif modo == "dispersão agrupada":
+            self.desenhar_dispersao_agrupada(notas_valores)
+        else:
+            self.desenhar_dispersao(alunos, notas_valores)
+        self.canvas.draw_idle()
+
+    def preparar(self, modo):
+        if self.modo == modo:
+            return False
+        self.ax.clear()
+        self.anotacoes = []
+        self.modo = modo
+        return True
+
+    def desenhar_dispersao(self, alunos, notas_valores):
+        if self.preparar("dispersao"):
+            self.pontos = self.ax.scatter([], [])
+            self.ax.set_xlabel('Alunos')
+            self.ax.set_ylabel('Notas')
+            self.ax.set_title('Notas dos Alunos por Disciplina')
+        posicoes = np.arange(len(notas_valores))
+        self.pontos.set_offsets(np.column_stack([posicoes, notas_valores]))
+        for anotacao in self.anotacoes:
+            anotacao.remove()
+        self.anotacoes = []
+        if len(notas_valores) <= self.LIMITE_ANOTACOES:
+            self.ax.set_xticks(posicoes, alunos)
+            for i, txt in enumerate(notas_valores):
+                self.anotacoes.append(self.ax.annotate(f"{txt:g}", (i, txt)))
+        else:
+            self.ax.set_xticks([])
+        self.ax.set_xlim(-1, max(len(notas_valores), 1))
+        if len(notas_valores):
+            self.ax.set_ylim(notas_valores.min() - 1, notas_valores.max() + 1)
+
+    def desenhar_boxplot(self, notas_valores):
+        if self.preparar("boxplot"):
+            self.caixa = {}
+            self.ax.set_xticks([])
+            self.ax.set_ylabel('Notas')
+        # boxplot nao tem como atualizar os artistas no lugar: troca so os da caixa anterior.
+        for artistas in self.caixa.values():
+            for artista in artistas:
+                artista.remove()
+        self.caixa = self.ax.boxplot(notas_valores, showmeans=True) if len(notas_valores) else {}
+        self.ax.set_xticks([])
+        if len(notas_valores):
+            self.ax.set_ylim(notas_valores.min() - 1, notas_valores.max() + 1)
+        self.ax.set_title(f'Notas da Disciplina ({len(notas_valores)} alunos)')
+
+    def desenhar_dispersao_agrupada(self, notas_valores):
+        # Dispersao de alunos x notas contada em celulas: o custo de desenho nao depende do numero de alunos.
+        if self.preparar("agrupada"):
+            self.imagem = self.ax.imshow(np.zeros((self.CLASSES_HISTOGRAMA, self.CLASSES_ALUNOS)), origin="lower",
+                                         aspect="auto", cmap="Blues", interpolation="nearest")
+            self.ax.set_xlabel('Alunos')
+            self.ax.set_ylabel('Notas')
+        if not len(notas_valores):
+            self.imagem.set_data(np.zeros((self.CLASSES_HISTOGRAMA, self.CLASSES_ALUNOS)))
+            self.imagem.set_clim(0, 1)
+            self.ax.set_title('Alunos por faixa de nota (sem notas)')
+            return
+        minimo, maximo = notas_valores.min(), notas_valores.max()
+        if minimo == maximo:
+            minimo, maximo = minimo - 0.5, maximo + 0.5
+        contagens, _, _ = np.histogram2d(np.arange(len(notas_valores)), notas_valores,
+                                         bins=(self.CLASSES_ALUNOS, self.CLASSES_HISTOGRAMA),
+                                         range=((0, len(notas_valores)), (minimo, maximo)))
+        self.imagem.set_data(contagens.T)
+        self.imagem.set_extent((0, len(notas_valores), minimo, maximo))
+        self.imagem.set_clim(0, max(contagens.max(), 1))
+        self.ax.set_title(f'Alunos por faixa de nota ({len(notas_valores)} alunos, cor = quantidade)')
+
+    def desenhar_histograma(self, notas_valores):
+        if self.preparar("histograma"):
+            _, _, self.barras = self.ax.hist([], bins=self.CLASSES_HISTOGRAMA, range=(0, 1))
+            self.linha_media = self.ax.axvline(0, color="red", label="Média")
+            self.linha_mediana = self.ax.axvline(0, color="green", linestyle="--", label="Mediana")
+            self.ax.legend()
+            self.ax.set_xlabel('Notas')
+            self.ax.set_ylabel('Alunos')
+        contagens, bordas = np.histogram(notas_valores, bins=self.CLASSES_HISTOGRAMA)
+        largura = bordas[1] - bordas[0]
+        for barra, inicio, altura in zip(self.barras, bordas, contagens):
+            barra.set_x(inicio)
+            barra.set_width(largura)
+            barra.set_height(altura)
+        # Sem notas a media e a mediana seriam NaN: as linhas ficam escondidas ate a proxima disciplina.
+        self.linha_media.set_visible(bool(len(notas_valores)))
+        self.linha_mediana.set_visible(bool(len(notas_valores)))
+        if len(notas_valores):
+            self.linha_media.set_xdata([notas_valores.mean()] * 2)
+            self.linha_mediana.set_xdata([np.median(notas_valores)] * 2)
+        self.ax.set_xlim(bordas[0], bordas[-1])
+        self.ax.set_ylim(0, max(contagens.max(), 1) * 1.1)
+        if len(notas_valores):
+            self.ax.set_title(f'Distribuição das Notas ({len(notas_valores)} alunos)')
+        else:
+            self.ax.set_title('Distribuição das Notas (sem notas)')
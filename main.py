@@ -1,140 +1,342 @@
+import queue
 import sqlite3
+import sys
+import threading
+import time
+from collections import defaultdict
+from functools import partial, wraps
+from itertools import count
 import tkinter as tk
-from tkinter import messagebox, ttk
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-
-class Database:
-    def __init__(self):
-        self.conn = sqlite3.connect("university.db")
-        self.create_tables()
-
-    def create_tables(self):
-        cursor = self.conn.cursor()
-        cursor.execute("""
-        CREATE TABLE IF NOT EXISTS Curso (
-            id INTEGER PRIMARY KEY,
-            nome TEXT NOT NULL
-        )""")
-        
-        cursor.execute("""
-        CREATE TABLE IF NOT EXISTS Disciplina (
-            id INTEGER PRIMARY KEY,
-            nome TEXT NOT NULL,
-            curso_id INTEGER,
-            FOREIGN KEY (curso_id) REFERENCES Curso(id)
-        )""")
-        
-        cursor.execute("""
-        CREATE TABLE IF NOT EXISTS Professor (
-            id INTEGER PRIMARY KEY,
-            nome TEXT NOT NULL,
-            curso_id INTEGER,
-            disciplina_id INTEGER,
-            FOREIGN KEY (curso_id) REFERENCES Curso(id),
-            FOREIGN KEY (disciplina_id) REFERENCES Disciplina(id)
-        )""")
-        
-        cursor.execute("""
-        CREATE TABLE IF NOT EXISTS Aluno (
-            id INTEGER PRIMARY KEY,
-            nome TEXT NOT NULL,
-            curso_id INTEGER,
-            FOREIGN KEY (curso_id) REFERENCES Curso(id)
-        )""")
-
-        cursor.execute("""
-        CREATE TABLE IF NOT EXISTS Matricula (
-            aluno_id INTEGER,
-            disciplina_id INTEGER,
-            PRIMARY KEY (aluno_id, disciplina_id),
-            FOREIGN KEY (aluno_id) REFERENCES Aluno(id),
-            FOREIGN KEY (disciplina_id) REFERENCES Disciplina(id)
-        )""")
-        
-        cursor.execute("""
-        CREATE TABLE IF NOT EXISTS Nota (
-            id INTEGER PRIMARY KEY,
-            aluno_id INTEGER,
-            disciplina_id INTEGER,
-            nota REAL,
-            FOREIGN KEY (aluno_id) REFERENCES Aluno(id),
-            FOREIGN KEY (disciplina_id) REFERENCES Disciplina(id)
-        )""")
-        
-        self.conn.commit()
-
-    def inserir_nota(self, aluno_id, disciplina_id, nota):
-        cursor = self.conn.cursor()
-        cursor.execute("INSERT INTO Nota (aluno_id, disciplina_id, nota) VALUES (?, ?, ?)", (aluno_id, disciplina_id, nota))
-        self.conn.commit()
-
-    def listar_notas_por_disciplina(self, disciplina_id):
-        cursor = self.conn.cursor()
-        cursor.execute("""
-        SELECT Aluno.nome, Nota.nota FROM Nota
-        JOIN Aluno ON Nota.aluno_id = Aluno.id
-        WHERE Nota.disciplina_id = ?
-        """, (disciplina_id,))
-        return cursor.fetchall()
-
-    def inserir(self, tabela, valores):
-        cursor = self.conn.cursor()
-        placeholders = ', '.join(['?'] * len(valores))
-        cursor.execute(f"INSERT INTO {tabela} VALUES ({placeholders})", valores)
-        self.conn.commit()
-
-    def remover(self, tabela, id):
-        cursor = self.conn.cursor()
-        cursor.execute(f"DELETE FROM {tabela} WHERE id = ?", (id,))
-        self.conn.commit()
-
-    def atualizar(self, tabela, coluna, valor, id):
-        cursor = self.conn.cursor()
-        cursor.execute(f"UPDATE {tabela} SET {coluna} = ? WHERE id = ?", (valor, id))
-        self.conn.commit()
-
-    def listar(self, tabela):
-        cursor = self.conn.cursor()
-        cursor.execute(f"SELECT * FROM {tabela}")
-        return cursor.fetchall()
-
-    def listar_disciplinas_por_curso(self, curso_id):
-        cursor = self.conn.cursor()
-        cursor.execute("SELECT * FROM Disciplina WHERE curso_id = ?", (curso_id,))
-        return cursor.fetchall()
-
-    def listar_alunos_por_disciplina(self, disciplina_id):
-        cursor = self.conn.cursor()
-        cursor.execute("""
-        SELECT Aluno.id, Aluno.nome FROM Aluno
-        JOIN Matricula ON Aluno.id = Matricula.aluno_id
-        WHERE Matricula.disciplina_id = ?
-        """, (disciplina_id,))
-        return cursor.fetchall()
-
-    def listar_professores_por_disciplina(self, disciplina_id):
-        cursor = self.conn.cursor()
-        cursor.execute("SELECT * FROM Professor WHERE disciplina_id = ?", (disciplina_id,))
-        return cursor.fetchall()
-
-    def listar_professores_por_curso(self, curso_id):
-        cursor = self.conn.cursor()
-        cursor.execute("SELECT * FROM Professor WHERE curso_id = ?", (curso_id,))
-        return cursor.fetchall()
-    
-    def matricula_existe(self, aluno_id, disciplina_id):
-        cursor = self.conn.cursor()
-        cursor.execute("SELECT COUNT(*) FROM Matricula WHERE aluno_id = ? AND disciplina_id = ?", (aluno_id, disciplina_id))
-        return cursor.fetchone()[0] > 0
+from tkinter import filedialog, messagebox, ttk
+import backup
+import exportacao
+from cliente import DatabaseRemoto, ErroServidor
+from database import Database, Instrumentacao, QueryCache
+
+class DatabaseWorker:
+    # Executa leituras numa thread com conexao propria; os resultados voltam ao Tk via root.after.
+    # funcao e o nome de um metodo do Database ou um callable que recebe o Database da thread.
+    def __init__(self, root, abrir_db, intervalo=50):
+        self.root = root
+        self.intervalo = intervalo
+        self.pedidos = queue.Queue()
+        self.resultados = queue.Queue()
+        self.geracoes = {}
+        self.contador = count(1)
+        self.abrir_db = abrir_db
+        self.thread = threading.Thread(target=self.executar, args=(abrir_db,), daemon=True)
+        self.thread.start()
+        self.agendamento = self.root.after(self.intervalo, self.entregar)
+
+    def submeter(self, chave, funcao, *args, ao_concluir=None, ao_falhar=None):
+        numero = next(self.contador)
+        self.geracoes[chave] = numero
+        self.pedidos.put((chave, numero, funcao, args, ao_concluir, ao_falhar))
+
+    def executar(self, abrir_db):
+        db = abrir_db()
+        while True:
+            pedido = self.pedidos.get()
+            if pedido is None:
+                break
+            chave, numero, funcao, args, ao_concluir, ao_falhar = pedido
+            if self.geracoes.get(chave) != numero:
+                continue
+            try:
+                if isinstance(funcao, str):
+                    resultado = getattr(db, funcao)(*args)
+                else:
+                    resultado = funcao(db, *args)
+                self.resultados.put((chave, numero, ao_concluir, resultado))
+            except Exception as erro:
+                self.resultados.put((chave, numero, ao_falhar, erro))
+        db.fechar()
+
+    def entregar(self):
+        # Um callback com erro e reportado pelo Tk sem interromper os demais nem o reagendamento.
+        try:
+            while True:
+                try:
+                    chave, numero, callback, valor = self.resultados.get_nowait()
+                except queue.Empty:
+                    break
+                if self.geracoes.get(chave) != numero:
+                    continue
+                del self.geracoes[chave]
+                if callback:
+                    try:
+                        callback(valor)
+                    except Exception:
+                        self.root.report_callback_exception(*sys.exc_info())
+        finally:
+            self.agendamento = self.root.after(self.intervalo, self.entregar)
+
+    def parar(self):
+        self.root.after_cancel(self.agendamento)
+        self.pedidos.put(None)
+
+
+class ObservadorAlteracoes:
+    # Le a tabela Alteracao quando db.marca_alteracoes() muda (PRAGMA data_version e total_changes
+    # no banco local, o ultimo seq no servidor) e repassa as linhas novas a quem se inscreveu.
+    def __init__(self, root, db, intervalo=300):
+        self.root = root
+        self.db = db
+        self.intervalo = intervalo
+        self.inscritos = defaultdict(list)
+        self.ultimo_seq = db.ultima_alteracao()
+        self.marca = self.db.marca_alteracoes()
+        self.agendamento = self.root.after(self.intervalo, self.verificar)
+
+    def inscrever(self, tabela, callback):
+        self.inscritos[tabela].append(callback)
+
+    def verificar(self):
+        # Uma leitura que falhe (banco travado, servidor fora do ar) e reportada e tentada de novo no
+        # proximo ciclo; a marca so avanca depois que todas as alteracoes foram lidas. Um atraso maior
+        # que VirtualListbox.LIMITE_INCREMENTAL (uma importacao grande, por exemplo) nao e lido linha a
+        # linha na thread do Tk: pula-se direto para o ultimo seq e as tabelas afetadas sao recarregadas.
+        try:
+            marca = self.db.marca_alteracoes()
+            if marca != self.marca:
+                ultimo = self.db.ultima_alteracao()
+                if ultimo - self.ultimo_seq > VirtualListbox.LIMITE_INCREMENTAL:
+                    tabelas = self.db.tabelas_com_alteracoes(self.ultimo_seq, ultimo)
+                    self.ultimo_seq = ultimo
+                    self.distribuir(dict.fromkeys(tabelas))
+                alteracoes = self.db.listar_alteracoes(self.ultimo_seq)
+                while alteracoes:
+                    self.ultimo_seq = alteracoes[-1][0]
+                    por_tabela = defaultdict(list)
+                    for alteracao in alteracoes:
+                        por_tabela[alteracao[1]].append(alteracao)
+                    self.distribuir(por_tabela)
+                    alteracoes = self.db.listar_alteracoes(self.ultimo_seq)
+                self.marca = marca
+        except Exception:
+            self.root.report_callback_exception(*sys.exc_info())
+        finally:
+            self.agendamento = self.root.after(self.intervalo, self.verificar)
+
+    def distribuir(self, por_tabela):
+        # Cada inscrito recebe as linhas novas da sua tabela, ou None quando deve recarregar tudo.
+        if self.db.cache is not None:
+            self.db.cache.invalidar(por_tabela)
+        for tabela, linhas in por_tabela.items():
+            for callback in self.inscritos[tabela]:
+                try:
+                    callback(linhas)
+                except Exception:
+                    self.root.report_callback_exception(*sys.exc_info())
+
+    def parar(self):
+        self.root.after_cancel(self.agendamento)
+
+
+class VirtualListbox(tk.Frame):
+    LIMITE_INCREMENTAL = 1000
+
+    def __init__(self, master, db, worker, tabela, formatar, altura=10, ao_remover=None):
+        super().__init__(master)
+        self.db = db
+        self.worker = worker
+        self.tabela = tabela
+        self.formatar = formatar
+        self.altura = altura
+        self.linhas = []
+        self.total = 0
+        self.menor_id = self.maior_id = None
+        self.total_label = tk.Label(self, anchor="w")
+        self.total_label.pack(side=tk.BOTTOM, fill=tk.X)
+        if ao_remover is not None:
+            tk.Button(self, text="Remover Selecionados",
+                      command=lambda: ao_remover(self.selecionados())).pack(side=tk.BOTTOM, fill=tk.X)
+        self.scrollbar = tk.Scrollbar(self, command=self.rolar)
+        self.listbox = tk.Listbox(self, height=altura, selectmode=tk.EXTENDED)
+        self.listbox.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.listbox.bind("<MouseWheel>", lambda e: self.deslocar(-1 if e.delta > 0 else 1) or "break")
+        self.listbox.bind("<Button-4>", lambda e: self.deslocar(-1) or "break")
+        self.listbox.bind("<Button-5>", lambda e: self.deslocar(1) or "break")
+
+    def atualizar(self):
+        self.total_label.config(text="Carregando...")
+        apos_id = self.linhas[0][0] - 1 if self.linhas else None
+        self.worker.submeter(f"VirtualListbox.{self.tabela}", self.carregar, apos_id, ao_concluir=self.aplicar)
+
+    def carregar(self, db, apos_id):
+        total = db.contar(self.tabela)
+        menor_id, maior_id = db.intervalo_ids(self.tabela)
+        return total, menor_id, maior_id, self.janela(db, apos_id, total, maior_id)
+
+    def aplicar(self, resultado):
+        self.total, self.menor_id, self.maior_id, linhas = resultado
+        self.total_label.config(text=f"Total: {self.total}")
+        self.mostrar(linhas)
+
+    def aplicar_alteracoes(self, alteracoes):
+        if alteracoes is None or len(alteracoes) > self.LIMITE_INCREMENTAL or self.menor_id is None:
+            self.atualizar()
+            return
+        alterados = set()
+        recalcular_intervalo = False
+        for _, _, registro_id, operacao in alteracoes:
+            alterados.add(registro_id)
+            if operacao == "I":
+                self.total += 1
+                self.maior_id = max(self.maior_id, registro_id)
+                self.menor_id = min(self.menor_id, registro_id)
+            elif operacao == "D":
+                self.total -= 1
+                recalcular_intervalo |= registro_id in (self.menor_id, self.maior_id)
+        if recalcular_intervalo:
+            self.menor_id, self.maior_id = self.db.intervalo_ids(self.tabela)
+        self.total_label.config(text=f"Total: {self.total}")
+        if not self.total:
+            self.mostrar([])
+        elif len(self.linhas) < self.altura or any(self.linhas[0][0] <= id <= self.linhas[-1][0] for id in alterados):
+            self.mostrar_a_partir(self.linhas[0][0] - 1 if self.linhas else None)
+        else:
+            self.mostrar(self.linhas)
+
+    def selecionados(self):
+        return [self.linhas[indice][0] for indice in self.listbox.curselection()]
+
+    def janela(self, db, apos_id, total, maior_id):
+        linhas = db.listar_pagina(self.tabela, apos_id=apos_id, limite=self.altura)
+        if len(linhas) < self.altura and total > len(linhas):
+            linhas = db.listar_pagina(self.tabela, antes_id=maior_id + 1, limite=self.altura)
+        return linhas
+
+    def mostrar_a_partir(self, apos_id):
+        self.mostrar(self.janela(self.db, apos_id, self.total, self.maior_id))
+
+    def mostrar(self, linhas):
+        self.linhas = linhas
+        self.listbox.delete(0, tk.END)
+        for linha in linhas:
+            self.listbox.insert(tk.END, self.formatar(linha))
+        if not linhas:
+            self.scrollbar.set(0, 1)
+            return
+        extensao = self.maior_id - self.menor_id + 1
+        self.scrollbar.set((linhas[0][0] - self.menor_id) / extensao, (linhas[-1][0] - self.menor_id + 1) / extensao)
+
+    def rolar(self, acao, quantidade, unidade=None):
+        if acao == "moveto":
+            if self.menor_id is not None:
+                alvo = self.menor_id + int(float(quantidade) * (self.maior_id - self.menor_id + 1))
+                self.mostrar_a_partir(alvo - 1)
+        else:
+            self.deslocar(int(quantidade) * (self.altura if unidade == "pages" else 1))
+
+    def deslocar(self, quantidade):
+        if not self.linhas:
+            return
+        quantidade = max(-self.altura, min(self.altura, quantidade))
+        if quantidade > 0:
+            novas = self.db.listar_pagina(self.tabela, apos_id=self.linhas[-1][0], limite=quantidade)
+            if novas:
+                self.mostrar((self.linhas + novas)[-self.altura:])
+        elif quantidade < 0:
+            novas = self.db.listar_pagina(self.tabela, antes_id=self.linhas[0][0], limite=-quantidade)
+            if novas:
+                self.mostrar((novas + self.linhas)[:self.altura])
 
 
 class BaseTab:
-    def __init__(self, notebook, db, tab_name):
+    acoes = ()
+
+    def __init__(self, notebook, db, worker, observador, tab_name):
         self.frame = ttk.Frame(notebook)
         notebook.add(self.frame, text=tab_name)
         self.db = db
-        self.create_widgets()
+        self.worker = worker
+        self.observador = observador
+        self.pendentes = set()
+        self.acao_corrente = None
+        self.tempo_modal = 0.0
+        self.status_label = tk.Label(self.frame, fg="gray")
+        self.status_label.grid(row=100, column=0, columnspan=2)
+        for nome in self.acoes:
+            setattr(self, nome, self.medir_acao(nome, getattr(self, nome)))
+        self.construida = False
+
+    def construir(self):
+        # Widgets e consultas iniciais so quando a aba e aberta pela primeira vez.
+        if not self.construida:
+            self.construida = True
+            self.create_widgets()
+
+    def medir_acao(self, nome, callback):
+        acao = f"{type(self).__name__}.{nome}"
+
+        @wraps(callback)
+        def envolvido(*args, **kwargs):
+            self.acao_corrente = {"acao": acao, "inicio": time.perf_counter(), "adiada": False}
+            self.tempo_modal = 0.0
+            try:
+                return callback(*args, **kwargs)
+            except (sqlite3.IntegrityError, ErroServidor) as erro:
+                # Com PRAGMA foreign_keys, ids de curso, disciplina ou aluno inexistentes sao recusados.
+                self.erro(f"Operação recusada pelo banco: {erro}")
+            except sqlite3.OperationalError as erro:
+                # "database is locked": outra conexao segurou o banco alem do busy_timeout. Outros erros sobem.
+                if "locked" not in str(erro):
+                    raise
+                self.erro(f"Banco ocupado, tente novamente: {erro}")
+            finally:
+                medicao, self.acao_corrente = self.acao_corrente, None
+                if not medicao["adiada"]:
+                    self.registrar_acao(medicao)
+        return envolvido
+
+    def registrar_acao(self, medicao):
+        if self.db.instrumentacao is None:
+            return
+        self.frame.update_idletasks()
+        duracao = time.perf_counter() - medicao["inicio"] - self.tempo_modal
+        self.db.instrumentacao.registrar_acao(medicao["acao"], duracao)
+
+    def sucesso(self, texto):
+        self.mensagem(messagebox.showinfo, "Sucesso", texto)
+
+    def erro(self, texto):
+        self.mensagem(messagebox.showerror, "Erro", texto)
+
+    def mensagem(self, mostrar, titulo, texto):
+        # O tempo com o dialogo aberto nao conta como latencia da acao.
+        inicio = time.perf_counter()
+        resposta = mostrar(titulo, texto)
+        self.tempo_modal += time.perf_counter() - inicio
+        return resposta
+
+    def consultar(self, chave, funcao, *args, ao_concluir):
+        chave = f"{type(self).__name__}.{chave}"
+        self.pendentes.add(chave)
+        self.status_label.config(text="Carregando...")
+        self.frame.config(cursor="watch")
+        medicao = self.acao_corrente
+        if medicao is not None:
+            medicao["adiada"] = True
+
+        def concluir(resultado):
+            self.concluir_consulta(chave)
+            ao_concluir(resultado)
+            if medicao is not None:
+                self.registrar_acao(medicao)
+
+        def falhar(erro):
+            self.concluir_consulta(chave)
+            self.erro(f"Falha na consulta: {erro}")
+
+        self.worker.submeter(chave, funcao, *args, ao_concluir=concluir, ao_falhar=falhar)
+
+    def concluir_consulta(self, chave):
+        self.pendentes.discard(chave)
+        if not self.pendentes:
+            self.status_label.config(text="")
+            self.frame.config(cursor="")
 
     def create_widgets(self):
         pass
@@ -149,10 +351,120 @@ class BaseTab:
         scrollbar.config(command=listbox.yview)
         return listbox
 
+    def create_search_box(self, tabela, row=0, col=2, rowspan=8, limite=20, atraso=250):
+        frame = tk.Frame(self.frame)
+        frame.grid(row=row, column=col, rowspan=rowspan, padx=10, pady=5, sticky="n")
+        tk.Label(frame, text="Buscar:").pack(anchor="w")
+        entry = tk.Entry(frame)
+        entry.pack(fill=tk.X)
+        resultados = tk.Listbox(frame, height=limite // 2)
+        resultados.pack(fill=tk.BOTH, expand=True)
+        agendamento = None
+
+        def mostrar(linhas):
+            resultados.delete(0, tk.END)
+            for linha in linhas:
+                resultados.insert(tk.END, f"ID: {linha[0]} - Nome: {linha[1]}")
+
+        def buscar():
+            termo = entry.get().strip()
+            if termo:
+                self.consultar(f"buscar.{tabela}", "buscar", tabela, termo, limite, ao_concluir=mostrar)
+            else:
+                mostrar([])
+
+        def ao_digitar(_evento):
+            nonlocal agendamento
+            if agendamento is not None:
+                self.frame.after_cancel(agendamento)
+            agendamento = self.frame.after(atraso, buscar)
+
+        entry.bind("<KeyRelease>", ao_digitar)
+        return entry
+
+    def exportar(self, chave, funcao, alvo, nome_padrao):
+        caminho = filedialog.asksaveasfilename(
+            initialfile=nome_padrao, defaultextension=".csv",
+            filetypes=[("CSV", "*.csv"), ("JSON Lines", "*.jsonl"), ("Compactado", "*.gz *.bz2 *.xz"), ("Todos", "*.*")])
+        if not caminho:
+            return
+        progresso = {"linhas": 0}
+        self.em_segundo_plano(
+            lambda db: funcao(db, alvo, caminho, progresso=lambda linhas: progresso.update(linhas=linhas)),
+            lambda: f"Exportando... {progresso['linhas']} linhas",
+            lambda total: self.sucesso(f"{total} linhas exportadas para {caminho}."),
+            "Falha ao exportar")
+
+    def em_segundo_plano(self, tarefa, status, ao_concluir, falha):
+        # Exportacoes e importacoes rodam numa thread com conexao propria, como o backup: nao ocupam o
+        # DatabaseWorker, entao a janela e as consultas das abas seguem respondendo enquanto isso.
+        estado = {"resultado": None, "erro": None}
+
+        def executar():
+            try:
+                db = self.worker.abrir_db()
+                try:
+                    estado["resultado"] = tarefa(db)
+                finally:
+                    db.fechar()
+            except (OSError, ValueError, IndexError, AttributeError, sqlite3.Error, ErroServidor) as erro:
+                estado["erro"] = erro
+
+        thread = threading.Thread(target=executar, daemon=True)
+        thread.start()
+
+        def acompanhar():
+            if thread.is_alive():
+                self.status_label.config(text=status())
+                self.frame.after(200, acompanhar)
+                return
+            self.status_label.config(text="")
+            if estado["erro"] is not None:
+                self.erro(f"{falha}: {estado['erro']}")
+            else:
+                ao_concluir(estado["resultado"])
+        acompanhar()
+
+    def create_virtual_listbox(self, tabela, formatar, row, col, rowspan=1, columnspan=1):
+        remover = self.medir_acao(f"remover_selecionados.{tabela}", partial(self.remover_selecionados, tabela))
+        listbox = VirtualListbox(self.frame, self.db, self.worker, tabela, formatar, ao_remover=remover)
+        self.observador.inscrever(tabela, listbox.aplicar_alteracoes)
+        listbox.grid(row=row, column=col, rowspan=rowspan, columnspan=columnspan, padx=10, pady=5)
+        return listbox
+
+    def remover_selecionados(self, tabela, ids):
+        if not ids:
+            self.erro("Selecione ao menos um registro na lista.")
+            return
+        if not self.mensagem(messagebox.askyesno, "Confirmar remoção",
+                             f"Remover {len(ids)} registro(s)? Os registros que dependem deles também serão removidos."):
+            return
+        removidos = self.db.remover_muitos(tabela, ids)
+        self.sucesso(f"{removidos} registro(s) removido(s) com sucesso!")
+
+    def importar_csv(self, tabela):
+        caminho = filedialog.askopenfilename(filetypes=[("CSV", "*.csv"), ("Todos", "*.*")])
+        if not caminho:
+            return
+        # As listas recebem as linhas novas pelo observador de alteracoes.
+        progresso = {"linhas": 0}
+        self.em_segundo_plano(
+            lambda db: db.importar_csv(tabela, caminho, progresso=lambda linhas: progresso.update(linhas=linhas)),
+            lambda: f"Importando... {progresso['linhas']} linhas",
+            lambda resultado: self.sucesso(f"{resultado[0]} linhas importadas ({resultado[1]:.0f} linhas/s)."),
+            "Falha ao importar CSV")
+
 
 class CursosTab(BaseTab):
-    def __init__(self, notebook, db):
-        super().__init__(notebook, db, "Cursos")
+    acoes = (
+        "inserir_curso",
+        "remover_curso",
+        "atualizar_curso",
+        "listar_disciplinas_por_curso",
+    )
+
+    def __init__(self, notebook, db, worker, observador):
+        super().__init__(notebook, db, worker, observador, "Cursos")
 
     def create_widgets(self):
         self.adicionar_curso_frame()
@@ -160,6 +472,7 @@ class CursosTab(BaseTab):
         self.atualizar_curso_frame()
         self.listar_cursos_frame()
         self.listar_disciplinas_por_curso_frame()
+        self.create_search_box("Curso")
 
     def adicionar_curso_frame(self):
         tk.Label(self.frame, text="Nome do Curso:").grid(row=0, column=0, padx=10, pady=5)
@@ -170,8 +483,7 @@ class CursosTab(BaseTab):
     def inserir_curso(self):
         nome = self.nome_entry.get()
         self.db.inserir("Curso", (None, nome))
-        messagebox.showinfo("Sucesso", "Curso inserido com sucesso!")
-        self.listar_cursos_frame()
+        self.sucesso("Curso inserido com sucesso!")
 
     def remover_curso_frame(self):
         tk.Label(self.frame, text="ID do Curso:").grid(row=2, column=0, padx=10, pady=5)
@@ -182,8 +494,7 @@ class CursosTab(BaseTab):
     def remover_curso(self):
         id_curso = self.id_entry.get()
         self.db.remover("Curso", int(id_curso))
-        messagebox.showinfo("Sucesso", "Curso removido com sucesso!")
-        self.listar_cursos_frame()
+        self.sucesso("Curso removido com sucesso!")
 
     def atualizar_curso_frame(self):
         tk.Label(self.frame, text="ID do Curso:").grid(row=4, column=0, padx=10, pady=5)
@@ -198,26 +509,31 @@ class CursosTab(BaseTab):
         id_curso = self.id_update_entry.get()
         novo_nome = self.nome_update_entry.get()
         self.db.atualizar("Curso", "nome", novo_nome, int(id_curso))
-        messagebox.showinfo("Sucesso", "Curso atualizado com sucesso!")
-        self.listar_cursos_frame()
+        self.sucesso("Curso atualizado com sucesso!")
 
     def listar_cursos_frame(self):
-        cursos = self.db.listar("Curso")
-        if hasattr(self, 'cursos_listbox'):
-            self.cursos_listbox.destroy()
-        self.cursos_listbox = self.create_scrollable_listbox(7, 0, columnspan=2)
-        for curso in cursos:
-            self.cursos_listbox.insert(tk.END, f"ID: {curso[0]} - Nome: {curso[1]}")
+        if not hasattr(self, 'cursos_listbox'):
+            self.cursos_listbox = self.create_virtual_listbox(
+                "Curso", lambda curso: f"ID: {curso[0]} - Nome: {curso[1]}", 7, 0, columnspan=2)
+        self.cursos_listbox.atualizar()
 
     def listar_disciplinas_por_curso_frame(self):
         tk.Label(self.frame, text="ID do Curso:").grid(row=8, column=0, padx=10, pady=5)
         self.id_curso_entry = tk.Entry(self.frame)
         self.id_curso_entry.grid(row=8, column=1, padx=10, pady=5)
-        tk.Button(self.frame, text="Listar Disciplinas", command=self.listar_disciplinas_por_curso).grid(row=9, column=0, columnspan=2, pady=5)
+        tk.Button(self.frame, text="Listar Disciplinas", command=self.listar_disciplinas_por_curso).grid(row=9, column=0, pady=5)
+        tk.Button(self.frame, text="Exportar Alunos", command=self.exportar_alunos_curso).grid(row=9, column=1, pady=5)
 
     def listar_disciplinas_por_curso(self):
         curso_id = self.id_curso_entry.get()
-        disciplinas = self.db.listar_disciplinas_por_curso(int(curso_id))
+        self.consultar("listar_disciplinas_por_curso", "listar_disciplinas_por_curso", int(curso_id),
+                       ao_concluir=self.mostrar_disciplinas_por_curso)
+
+    def exportar_alunos_curso(self):
+        curso_id = int(self.id_curso_entry.get())
+        self.exportar("alunos_curso", exportacao.exportar_alunos_curso, curso_id, f"alunos_curso_{curso_id}.csv")
+
+    def mostrar_disciplinas_por_curso(self, disciplinas):
         if hasattr(self, 'disciplinas_listbox'):
             self.disciplinas_listbox.destroy()
         self.disciplinas_listbox = self.create_scrollable_listbox(10, 0, columnspan=2)
@@ -225,14 +541,21 @@ class CursosTab(BaseTab):
             self.disciplinas_listbox.insert(tk.END, f"ID: {disciplina[0]} - Nome: {disciplina[1]} - Curso ID: {disciplina[2]}")
 
 class DisciplinasTab(BaseTab):
-    def __init__(self, notebook, db):
-        super().__init__(notebook, db, "Disciplinas")
+    acoes = (
+        "inserir_disciplina",
+        "remover_disciplina",
+        "atualizar_disciplina",
+    )
+
+    def __init__(self, notebook, db, worker, observador):
+        super().__init__(notebook, db, worker, observador, "Disciplinas")
 
     def create_widgets(self):
         self.adicionar_disciplina_frame()
         self.remover_disciplina_frame()
         self.atualizar_disciplina_frame()
         self.listar_disciplinas_frame()
+        self.create_search_box("Disciplina")
 
     def adicionar_disciplina_frame(self):
         tk.Label(self.frame, text="Nome da Disciplina:").grid(row=0, column=0, padx=10, pady=5)
@@ -247,8 +570,7 @@ class DisciplinasTab(BaseTab):
         nome = self.nome_entry.get()
         curso_id = self.curso_id_entry.get()
         self.db.inserir("Disciplina", (None, nome, curso_id))
-        messagebox.showinfo("Sucesso", "Disciplina inserida com sucesso!")
-        self.listar_disciplinas_frame()
+        self.sucesso("Disciplina inserida com sucesso!")
 
     def remover_disciplina_frame(self):
         tk.Label(self.frame, text="ID da Disciplina:").grid(row=3, column=0, padx=10, pady=5)
@@ -259,8 +581,7 @@ class DisciplinasTab(BaseTab):
     def remover_disciplina(self):
         id_disciplina = self.id_entry.get()
         self.db.remover("Disciplina", int(id_disciplina))
-        messagebox.showinfo("Sucesso", "Disciplina removida com sucesso!")
-        self.listar_disciplinas_frame()
+        self.sucesso("Disciplina removida com sucesso!")
 
     def atualizar_disciplina_frame(self):
         tk.Label(self.frame, text="ID da Disciplina:").grid(row=5, column=0, padx=10, pady=5)
@@ -275,26 +596,30 @@ class DisciplinasTab(BaseTab):
         id_disciplina = self.id_update_entry.get()
         novo_nome = self.nome_update_entry.get()
         self.db.atualizar("Disciplina", "nome", novo_nome, int(id_disciplina))
-        messagebox.showinfo("Sucesso", "Disciplina atualizada com sucesso!")
-        self.listar_disciplinas_frame()
+        self.sucesso("Disciplina atualizada com sucesso!")
 
     def listar_disciplinas_frame(self):
-        disciplinas = self.db.listar("Disciplina")
-        if hasattr(self, 'disciplinas_listbox'):
-            self.disciplinas_listbox.destroy()
-        self.disciplinas_listbox = self.create_scrollable_listbox(8, 0, columnspan=2)
-        for disciplina in disciplinas:
-            self.disciplinas_listbox.insert(tk.END, f"ID: {disciplina[0]} - Nome: {disciplina[1]} - Curso ID: {disciplina[2]}")
+        if not hasattr(self, 'disciplinas_listbox'):
+            self.disciplinas_listbox = self.create_virtual_listbox(
+                "Disciplina", lambda disciplina: f"ID: {disciplina[0]} - Nome: {disciplina[1]} - Curso ID: {disciplina[2]}", 8, 0, columnspan=2)
+        self.disciplinas_listbox.atualizar()
 
 class ProfessoresTab(BaseTab):
-    def __init__(self, notebook, db):
-        super().__init__(notebook, db, "Professores")
+    acoes = (
+        "inserir_professor",
+        "remover_professor",
+        "atualizar_professor",
+    )
+
+    def __init__(self, notebook, db, worker, observador):
+        super().__init__(notebook, db, worker, observador, "Professores")
 
     def create_widgets(self):
         self.adicionar_professor_frame()
         self.remover_professor_frame()
         self.atualizar_professor_frame()
         self.listar_professores_frame()
+        self.create_search_box("Professor")
 
     def adicionar_professor_frame(self):
         tk.Label(self.frame, text="Nome do Professor:").grid(row=0, column=0, padx=10, pady=5)
@@ -313,8 +638,7 @@ class ProfessoresTab(BaseTab):
         curso_id = self.curso_id_entry.get()
         disciplina_id = self.disciplina_id_entry.get()
         self.db.inserir("Professor", (None, nome, curso_id, disciplina_id))
-        messagebox.showinfo("Sucesso", "Professor inserido com sucesso!")
-        self.listar_professores_frame()
+        self.sucesso("Professor inserido com sucesso!")
 
     def remover_professor_frame(self):
         tk.Label(self.frame, text="ID do Professor:").grid(row=4, column=0, padx=10, pady=5)
@@ -325,8 +649,7 @@ class ProfessoresTab(BaseTab):
     def remover_professor(self):
         id_professor = self.id_entry.get()
         self.db.remover("Professor", int(id_professor))
-        messagebox.showinfo("Sucesso", "Professor removido com sucesso!")
-        self.listar_professores_frame()
+        self.sucesso("Professor removido com sucesso!")
 
     def atualizar_professor_frame(self):
         tk.Label(self.frame, text="ID do Professor:").grid(row=6, column=0, padx=10, pady=5)
@@ -341,20 +664,28 @@ class ProfessoresTab(BaseTab):
         id_professor = self.id_update_entry.get()
         novo_nome = self.nome_update_entry.get()
         self.db.atualizar("Professor", "nome", novo_nome, int(id_professor))
-        messagebox.showinfo("Sucesso", "Professor atualizado com sucesso!")
-        self.listar_professores_frame()
+        self.sucesso("Professor atualizado com sucesso!")
 
     def listar_professores_frame(self):
-        professores = self.db.listar("Professor")
-        if hasattr(self, 'professores_listbox'):
-            self.professores_listbox.destroy()
-        self.professores_listbox = self.create_scrollable_listbox(9, 0, columnspan=2)
-        for professor in professores:
-            self.professores_listbox.insert(tk.END, f"ID: {professor[0]} - Nome: {professor[1]} - Curso ID: {professor[2]} - Disciplina ID: {professor[3]}")
+        if not hasattr(self, 'professores_listbox'):
+            self.professores_listbox = self.create_virtual_listbox(
+                "Professor", lambda professor: f"ID: {professor[0]} - Nome: {professor[1]} - Curso ID: {professor[2]} - Disciplina ID: {professor[3]}", 9, 0, columnspan=2)
+        self.professores_listbox.atualizar()
 
 class AlunosTab(BaseTab):
-    def __init__(self, notebook, db):
-        super().__init__(notebook, db, "Alunos")
+    acoes = (
+        "inserir_aluno",
+        "remover_aluno",
+        "atualizar_aluno",
+        "matricular_aluno",
+        "listar_alunos_por_disciplina",
+        "importar_alunos_csv",
+        "previa_matricula_curso",
+        "matricular_curso",
+    )
+
+    def __init__(self, notebook, db, worker, observador):
+        super().__init__(notebook, db, worker, observador, "Alunos")
 
     def create_widgets(self):
         self.adicionar_aluno_frame()
@@ -363,6 +694,9 @@ class AlunosTab(BaseTab):
         self.listar_alunos_frame()
         self.matricular_aluno_frame()
         self.listar_alunos_por_disciplina_frame()
+        self.create_search_box("Aluno")
+        self.importar_csv_frame()
+        self.matricular_curso_frame()
 
     def adicionar_aluno_frame(self):
         tk.Label(self.frame, text="Nome do Aluno:").grid(row=0, column=0, padx=10, pady=5)
@@ -377,8 +711,7 @@ class AlunosTab(BaseTab):
         nome = self.nome_entry.get()
         curso_id = self.curso_id_entry.get()
         self.db.inserir("Aluno", (None, nome, int(curso_id)))
-        messagebox.showinfo("Sucesso", "Aluno inserido com sucesso!")
-        self.listar_alunos_frame()
+        self.sucesso("Aluno inserido com sucesso!")
 
     def remover_aluno_frame(self):
         tk.Label(self.frame, text="ID do Aluno:").grid(row=3, column=0, padx=10, pady=5)
@@ -389,8 +722,7 @@ class AlunosTab(BaseTab):
     def remover_aluno(self):
         id_aluno = self.id_entry.get()
         self.db.remover("Aluno", int(id_aluno))
-        messagebox.showinfo("Sucesso", "Aluno removido com sucesso!")
-        self.listar_alunos_frame()
+        self.sucesso("Aluno removido com sucesso!")
 
     def atualizar_aluno_frame(self):
         tk.Label(self.frame, text="ID do Aluno:").grid(row=5, column=0, padx=10, pady=5)
@@ -405,16 +737,13 @@ class AlunosTab(BaseTab):
         id_aluno = self.id_update_entry.get()
         novo_nome = self.nome_update_entry.get()
         self.db.atualizar("Aluno", "nome", novo_nome, int(id_aluno))
-        messagebox.showinfo("Sucesso", "Aluno atualizado com sucesso!")
-        self.listar_alunos_frame()
+        self.sucesso("Aluno atualizado com sucesso!")
 
     def listar_alunos_frame(self):
-        alunos = self.db.listar("Aluno")
-        if hasattr(self, 'alunos_listbox'):
-            self.alunos_listbox.destroy()
-        self.alunos_listbox = self.create_scrollable_listbox(8, 0, columnspan=2)
-        for aluno in alunos:
-            self.alunos_listbox.insert(tk.END, f"ID: {aluno[0]} - Nome: {aluno[1]}")
+        if not hasattr(self, 'alunos_listbox'):
+            self.alunos_listbox = self.create_virtual_listbox(
+                "Aluno", lambda aluno: f"ID: {aluno[0]} - Nome: {aluno[1]}", 8, 0, columnspan=2)
+        self.alunos_listbox.atualizar()
 
     def matricular_aluno_frame(self):
         tk.Label(self.frame, text="ID do Aluno:").grid(row=10, column=0, padx=10, pady=5)
@@ -428,11 +757,10 @@ class AlunosTab(BaseTab):
     def matricular_aluno(self):
         aluno_id = self.aluno_id_entry.get()
         disciplina_id = self.disciplina_id_entry.get()
-        if self.db.matricula_existe(int(aluno_id), int(disciplina_id)):
-            messagebox.showerror("Erro", "O aluno já está matriculado nesta disciplina.")
+        if self.db.matricular(int(aluno_id), int(disciplina_id)):
+            self.sucesso("Aluno matriculado com sucesso!")
         else:
-            self.db.inserir("Matricula", (int(aluno_id), int(disciplina_id)))
-            messagebox.showinfo("Sucesso", "Aluno matriculado com sucesso!")
+            self.erro("O aluno já está matriculado nesta disciplina.")
 
     def listar_alunos_por_disciplina_frame(self):
         tk.Label(self.frame, text="ID da Disciplina:").grid(row=13, column=0, padx=10, pady=5)
@@ -443,18 +771,124 @@ class AlunosTab(BaseTab):
 
     def listar_alunos_por_disciplina(self):
         id_disciplina = self.id_disciplina_entry.get()
-        alunos = self.db.listar_alunos_por_disciplina(int(id_disciplina))
+        self.consultar("listar_alunos_por_disciplina", "listar_alunos_por_disciplina", int(id_disciplina),
+                       ao_concluir=self.mostrar_alunos_por_disciplina)
+
+    def mostrar_alunos_por_disciplina(self, alunos):
         self.alunos_disciplina_listbox.delete(0, tk.END)
         for aluno in alunos:
             self.alunos_disciplina_listbox.insert(tk.END, f"ID: {aluno[0]} - Nome: {aluno[1]}")
 
+    def importar_csv_frame(self):
+        tk.Button(self.frame, text="Importar CSV de Alunos", command=self.importar_alunos_csv).grid(row=16, column=0, pady=5)
+        tk.Button(self.frame, text="Importar CSV de Matrículas", command=lambda: self.importar_csv("Matricula")).grid(row=16, column=1, pady=5)
+
+    def matricular_curso_frame(self):
+        tk.Label(self.frame, text="ID do Curso (turma):").grid(row=17, column=0, padx=10, pady=5)
+        self.curso_turma_entry = tk.Entry(self.frame)
+        self.curso_turma_entry.grid(row=17, column=1, padx=10, pady=5)
+        tk.Label(self.frame, text="IDs das Disciplinas (ex.: 1, 2, 3):").grid(row=18, column=0, padx=10, pady=5)
+        self.disciplinas_turma_entry = tk.Entry(self.frame)
+        self.disciplinas_turma_entry.grid(row=18, column=1, padx=10, pady=5)
+        tk.Button(self.frame, text="Pré-visualizar", command=self.previa_matricula_curso).grid(row=19, column=0, pady=5)
+        tk.Button(self.frame, text="Matricular Turma", command=self.matricular_curso).grid(row=19, column=1, pady=5)
+        self.previa_label = tk.Label(self.frame)
+        self.previa_label.grid(row=20, column=0, columnspan=2, padx=10, pady=5)
+
+    def ler_turma(self):
+        curso_id = int(self.curso_turma_entry.get())
+        disciplina_ids = tuple(int(parte) for parte in self.disciplinas_turma_entry.get().replace(";", ",").split(",") if parte.strip())
+        return curso_id, disciplina_ids
+
+    def previa_matricula_curso(self):
+        curso_id, disciplina_ids = self.ler_turma()
+        self.consultar("previa_matricula_curso", "previa_matricula_curso", curso_id, disciplina_ids,
+                       ao_concluir=self.mostrar_previa)
+
+    def mostrar_previa(self, previa):
+        self.previa_label.config(text=f"{previa['alunos']} alunos x {previa['disciplinas']} disciplinas: "
+                                      f"{previa['novas']} matrículas novas, {previa['existentes']} já existentes"
+                                      + (f"\nDisciplinas inexistentes: {', '.join(map(str, previa['inexistentes']))}"
+                                         if previa['inexistentes'] else ""))
+
+    def matricular_curso(self):
+        curso_id, disciplina_ids = self.ler_turma()
+        resumo = self.db.matricular_curso(curso_id, disciplina_ids)
+        self.previa_label.config(text="")
+        self.sucesso(f"{resumo['inseridas']} matrículas criadas, {resumo['existentes']} já existentes.")
+
+    def importar_alunos_csv(self):
+        self.importar_csv("Aluno")
+
 class NotasTab(BaseTab):
-    def __init__(self, notebook, db):
-        super().__init__(notebook, db, "Notas")
+    acoes = (
+        "inserir_nota",
+        "gerar_grafico",
+        "calcular_estatisticas",
+        "reajustar_notas",
+        "desfazer_reajuste",
+    )
+    COLUNAS_ESTATISTICAS = (
+        ("grupo", "ID", "{:.0f}"),
+        ("n", "Notas", "{:.0f}"),
+        ("media", "Média", "{:.2f}"),
+        ("mediana", "Mediana", "{:.2f}"),
+        ("desvio", "Desvio", "{:.2f}"),
+        ("minimo", "Mín", "{:.1f}"),
+        ("maximo", "Máx", "{:.1f}"),
+        ("p10", "P10", "{:.1f}"),
+        ("p90", "P90", "{:.1f}"),
+        ("aprovacao", "Aprovação", "{:.0%}"),
+    )
+
+    def __init__(self, notebook, db, worker, observador):
+        self.analise = None
+        self.ultimo_reajuste = None
+        super().__init__(notebook, db, worker, observador, "Notas")
 
     def create_widgets(self):
         self.adicionar_nota_frame()
         self.gerar_grafico_frame()
+        self.importar_csv_frame()
+        self.estatisticas_frame()
+        self.reajuste_frame()
+
+    def estatisticas_frame(self):
+        frame = tk.Frame(self.frame)
+        frame.grid(row=0, column=2, rowspan=8, padx=10, pady=5, sticky="n")
+        tk.Label(frame, text="Estatísticas por:").pack(anchor="w")
+        self.agrupamento = ttk.Combobox(frame, values=("disciplina", "curso", "professor"), state="readonly")
+        self.agrupamento.set("disciplina")
+        self.agrupamento.pack(fill=tk.X)
+        tk.Button(frame, text="Calcular Estatísticas", command=self.calcular_estatisticas).pack(pady=5)
+        self.estatisticas_tree = ttk.Treeview(frame, columns=[coluna for coluna, _, _ in self.COLUNAS_ESTATISTICAS],
+                                              show="headings", height=15)
+        for coluna, titulo, _ in self.COLUNAS_ESTATISTICAS:
+            self.estatisticas_tree.heading(coluna, text=titulo)
+            self.estatisticas_tree.column(coluna, width=70, anchor="e")
+        scrollbar = tk.Scrollbar(frame, command=self.estatisticas_tree.yview)
+        self.estatisticas_tree.config(yscrollcommand=scrollbar.set)
+        self.estatisticas_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+
+    def calcular_estatisticas(self):
+        self.consultar("estatisticas", self.carregar_estatisticas, self.agrupamento.get(),
+                       ao_concluir=self.mostrar_estatisticas)
+
+    def carregar_estatisticas(self, db, agrupamento):
+        # Roda na thread do DatabaseWorker, que e a unica a mexer em self.analise.
+        if self.analise is None:
+            from analise import AnaliseNotas
+            self.analise = AnaliseNotas()
+        self.analise.atualizar(db)
+        return getattr(self.analise, f"por_{agrupamento}")()
+
+    def mostrar_estatisticas(self, estatisticas):
+        self.estatisticas_tree.delete(*self.estatisticas_tree.get_children())
+        colunas = [estatisticas[coluna].tolist() for coluna, _, _ in self.COLUNAS_ESTATISTICAS]
+        formatos = [formato for _, _, formato in self.COLUNAS_ESTATISTICAS]
+        for linha in zip(*colunas):
+            self.estatisticas_tree.insert("", tk.END, values=[formato.format(valor) for formato, valor in zip(formatos, linha)])
 
     def adicionar_nota_frame(self):
         tk.Label(self.frame, text="ID do Aluno:").grid(row=0, column=0, padx=10, pady=5)
@@ -469,58 +903,217 @@ class NotasTab(BaseTab):
         self.nota_entry = tk.Entry(self.frame)
         self.nota_entry.grid(row=2, column=1, padx=10, pady=5)
         
-        tk.Button(self.frame, text="Adicionar Nota", command=self.inserir_nota).grid(row=3, column=0, columnspan=2, pady=5)
+        tk.Button(self.frame, text="Adicionar Nota", command=self.inserir_nota).grid(row=3, column=0, pady=5)
 
     def inserir_nota(self):
         aluno_id = self.aluno_id_entry.get()
         disciplina_id = self.disciplina_id_entry.get()
         nota = self.nota_entry.get()
         self.db.inserir_nota(int(aluno_id), int(disciplina_id), float(nota))
-        messagebox.showinfo("Sucesso", "Nota inserida com sucesso!")
+        self.sucesso("Nota registrada com sucesso!")
+
+    def importar_csv_frame(self):
+        tk.Button(self.frame, text="Importar CSV", command=lambda: self.importar_csv("Nota")).grid(row=3, column=1, pady=5)
 
     def gerar_grafico_frame(self):
         tk.Label(self.frame, text="ID da Disciplina para Gráfico:").grid(row=4, column=0, padx=10, pady=5)
         self.disciplina_id_grafico_entry = tk.Entry(self.frame)
         self.disciplina_id_grafico_entry.grid(row=4, column=1, padx=10, pady=5)
         
-        tk.Button(self.frame, text="Gerar Gráfico", command=self.gerar_grafico).grid(row=5, column=0, columnspan=2, pady=5)
+        tk.Button(self.frame, text="Gerar Gráfico", command=self.gerar_grafico).grid(row=5, column=0, pady=5)
+        tk.Button(self.frame, text="Exportar Notas", command=self.exportar_notas).grid(row=5, column=1, pady=5)
+        self.modo_grafico = ttk.Combobox(self.frame, values=("automático", "histograma", "box plot", "dispersão agrupada"),
+                                         state="readonly")
+        self.modo_grafico.set("automático")
+        self.modo_grafico.grid(row=7, column=0, padx=10, pady=5)
+        self.modo_grafico.bind("<<ComboboxSelected>>", lambda _evento: self.redesenhar_grafico())
+        tk.Button(self.frame, text="Exportar Todas as Notas", command=self.exportar_tabela_notas).grid(row=7, column=1, pady=5)
+
+    def reajuste_frame(self):
+        tk.Label(self.frame, text="Fator de Reajuste:").grid(row=8, column=0, padx=10, pady=5)
+        self.fator_entry = tk.Entry(self.frame)
+        self.fator_entry.insert(0, "1.0")
+        self.fator_entry.grid(row=8, column=1, padx=10, pady=5)
+
+        tk.Label(self.frame, text="Pontos a Somar:").grid(row=9, column=0, padx=10, pady=5)
+        self.acrescimo_entry = tk.Entry(self.frame)
+        self.acrescimo_entry.insert(0, "0.0")
+        self.acrescimo_entry.grid(row=9, column=1, padx=10, pady=5)
+
+        tk.Button(self.frame, text="Reajustar Notas da Disciplina", command=self.reajustar_notas).grid(row=10, column=0, pady=5)
+        tk.Button(self.frame, text="Desfazer Reajuste", command=self.desfazer_reajuste).grid(row=10, column=1, pady=5)
+
+    def reajustar_notas(self):
+        disciplina_id = int(self.disciplina_id_grafico_entry.get())
+        fator = float(self.fator_entry.get())
+        acrescimo = float(self.acrescimo_entry.get())
+        if not self.mensagem(messagebox.askyesno, "Confirmar reajuste",
+                             f"Aplicar nota × {fator} + {acrescimo} (entre 0 e 10) a todas as notas da disciplina {disciplina_id}?"):
+            return
+        resultado = self.db.reajustar_notas(disciplina_id, fator, acrescimo)
+        self.ultimo_reajuste = resultado["reajuste"]
+        self.sucesso(f"{resultado['notas']} notas reajustadas. As notas anteriores ficaram registradas na auditoria.")
+
+    def desfazer_reajuste(self):
+        if self.ultimo_reajuste is None:
+            self.erro("Nenhum reajuste foi feito nesta sessão.")
+            return
+        restauradas = self.db.desfazer_reajuste(self.ultimo_reajuste)
+        self.ultimo_reajuste = None
+        self.sucesso(f"{restauradas} notas voltaram ao valor anterior ao reajuste.")
+
+    def exportar_notas(self):
+        disciplina_id = int(self.disciplina_id_grafico_entry.get())
+        self.exportar("notas", exportacao.exportar_notas, disciplina_id, f"notas_disciplina_{disciplina_id}.csv")
+
+    def exportar_tabela_notas(self):
+        self.exportar("tabela_notas", exportacao.exportar_tabela, "Nota", "notas.csv")
 
     def gerar_grafico(self):
         disciplina_id = self.disciplina_id_grafico_entry.get()
-        notas = self.db.listar_notas_por_disciplina(int(disciplina_id))
-        
-        alunos = [nota[0] for nota in notas]
-        notas_valores = [nota[1] for nota in notas]
-        
-        fig, ax = plt.subplots()
-        ax.scatter(alunos, notas_valores)
-        
-        ax.set_xlabel('Alunos')
-        ax.set_ylabel('Notas')
-        ax.set_title('Notas dos Alunos por Disciplina')
-        
-        for i, txt in enumerate(notas_valores):
-            ax.annotate(txt, (alunos[i], notas_valores[i]))
-        
-        canvas = FigureCanvasTkAgg(fig, master=self.frame)
-        canvas.get_tk_widget().grid(row=6, column=0, columnspan=2)
-        canvas.draw()
+        self.consultar("gerar_grafico", "listar_notas_por_disciplina", int(disciplina_id),
+                       ao_concluir=self.desenhar_grafico)
+
+    def desenhar_grafico(self, notas):
+        if not hasattr(self, 'grafico'):
+            # matplotlib e numpy so sao importados no primeiro grafico.
+            from grafico import GraficoNotas
+            self.grafico = GraficoNotas(self.frame, row=6, column=0, columnspan=2)
+        self.notas_grafico = notas
+        self.grafico.atualizar(notas, self.modo_grafico.get())
+
+    def redesenhar_grafico(self):
+        # Trocar o modo reaproveita as notas ja carregadas, sem nova consulta.
+        if hasattr(self, 'grafico'):
+            self.grafico.atualizar(self.notas_grafico, self.modo_grafico.get())
+
+class DiagnosticoTab(BaseTab):
+    def __init__(self, notebook, db, worker, observador):
+        super().__init__(notebook, db, worker, observador, "Diagnóstico")
+
+    def create_widgets(self):
+        tk.Label(self.frame, text="Latência por ação (ms)").grid(row=0, column=0, columnspan=2, padx=10, pady=5)
+        self.acoes_listbox = self.create_scrollable_listbox(1, 0, columnspan=2)
+        self.acoes_listbox.config(width=90)
+        tk.Label(self.frame, text="Consultas lentas").grid(row=2, column=0, columnspan=2, padx=10, pady=5)
+        self.lentas_listbox = self.create_scrollable_listbox(3, 0, columnspan=2)
+        self.lentas_listbox.config(width=90)
+        self.cache_label = tk.Label(self.frame)
+        self.cache_label.grid(row=4, column=0, columnspan=2, padx=10, pady=5)
+        tk.Button(self.frame, text="Atualizar", command=self.atualizar_diagnostico).grid(row=5, column=0, pady=5)
+        tk.Button(self.frame, text="Exportar JSON", command=self.exportar_diagnostico).grid(row=5, column=1, pady=5)
+        tk.Button(self.frame, text="Fazer Backup", command=self.fazer_backup).grid(row=6, column=0, columnspan=2, pady=5)
+        self.atualizar_diagnostico()
+
+    def atualizar_diagnostico(self):
+        instrumentacao = self.db.instrumentacao
+        self.acoes_listbox.delete(0, tk.END)
+        self.lentas_listbox.delete(0, tk.END)
+        for acao, resumo in instrumentacao.resumo_acoes().items():
+            self.acoes_listbox.insert(tk.END, f"{acao}: {resumo['chamadas']}x - p50 {resumo['p50_ms']:.1f} - "
+                                              f"p95 {resumo['p95_ms']:.1f} - máx {resumo['max_ms']:.1f}")
+        for registro in reversed(instrumentacao.consultas_lentas()):
+            self.lentas_listbox.insert(tk.END, f"{registro['metodo']}: {registro['duracao_ms']:.1f} ms - "
+                                               f"{registro['linhas']} linhas")
+        if self.db.cache is not None:
+            estatisticas = self.db.cache.estatisticas()
+            self.cache_label.config(text=f"Cache: {estatisticas['acertos']} acertos, {estatisticas['falhas']} falhas "
+                                         f"({estatisticas['taxa_acerto']:.0%}), {estatisticas['entradas']} entradas")
+
+    def exportar_diagnostico(self):
+        caminho = filedialog.asksaveasfilename(defaultextension=".json", filetypes=[("JSON", "*.json")])
+        if not caminho:
+            return
+        extras = {"cache": self.db.cache.estatisticas()} if self.db.cache is not None else {}
+        self.db.instrumentacao.exportar_json(caminho, extras)
+        self.sucesso("Diagnóstico exportado com sucesso!")
+
+    def fazer_backup(self):
+        if isinstance(self.db, DatabaseRemoto):
+            self.erro("No modo servidor, faça o backup na máquina do servidor (python backup.py).")
+            return
+        caminho = filedialog.asksaveasfilename(initialfile=backup.nome_snapshot(self.db.caminho), defaultextension=".db",
+                                               filetypes=[("SQLite", "*.db"), ("Todos", "*.*")])
+        if not caminho:
+            return
+        # Numa thread propria, fora do DatabaseWorker: a copia nao atrasa as consultas das abas.
+        estado = {"copiadas": 0, "total": 0, "resultado": None, "erro": None}
+
+        def executar():
+            try:
+                estado["resultado"] = backup.copiar(
+                    self.db.caminho, caminho, progresso=lambda copiadas, total: estado.update(copiadas=copiadas, total=total))
+            except (OSError, sqlite3.Error) as erro:
+                estado["erro"] = erro
+
+        thread = threading.Thread(target=executar, daemon=True)
+        thread.start()
+
+        def acompanhar():
+            if thread.is_alive():
+                if estado["total"]:
+                    self.status_label.config(text=f"Backup... {estado['copiadas'] / estado['total']:.0%}")
+                self.frame.after(200, acompanhar)
+                return
+            self.status_label.config(text="")
+            if estado["erro"] is not None:
+                self.erro(f"Falha no backup: {estado['erro']}")
+            else:
+                resultado = estado["resultado"]
+                self.sucesso(f"Backup verificado gravado em {resultado['destino']} "
+                             f"({resultado['bytes'] / 1024:.0f} KiB em {resultado['segundos']:.1f} s).")
+        acompanhar()
 
 class App:
-    def __init__(self, root):
-        self.db = Database()
+    def __init__(self, root, desempenho=False, servidor=None):
+        instrumentacao = Instrumentacao()
+        if servidor:
+            # Cada thread fala com o servidor pela propria conexao HTTP, como faria com o sqlite3.
+            self.db = DatabaseRemoto(servidor, instrumentacao)
+            abrir_db = partial(DatabaseRemoto, servidor, instrumentacao)
+        else:
+            self.db = Database(desempenho=desempenho, cache=QueryCache(), instrumentacao=instrumentacao)
+            abrir_db = partial(Database, self.db.caminho, desempenho, self.db.cache, instrumentacao)
         self.root = root
         self.root.title("Sistema Universitário")
         self.notebook = ttk.Notebook(root)
         self.notebook.pack(expand=1, fill="both")
+        self.worker = DatabaseWorker(root, abrir_db)
+        self.db.podar_alteracoes()
+        self.observador = ObservadorAlteracoes(root, self.db)
+        self.root.protocol("WM_DELETE_WINDOW", self.fechar)
+        self.notebook.bind("<<NotebookTabChanged>>", self.abrir_aba)
+
+        self.abas = [
+            aba(self.notebook, self.db, self.worker, self.observador)
+            for aba in (CursosTab, DisciplinasTab, ProfessoresTab, AlunosTab, NotasTab, DiagnosticoTab)
+        ]
+
+    def abrir_aba(self, _evento):
+        self.abas[self.notebook.index("current")].construir()
 
-        CursosTab(self.notebook, self.db)
-        DisciplinasTab(self.notebook, self.db)
-        ProfessoresTab(self.notebook, self.db)
-        AlunosTab(self.notebook, self.db)
-        NotasTab(self.notebook, self.db)
+    def fechar(self):
+        self.observador.parar()
+        self.worker.parar()
+        self.root.destroy()
 
 if __name__ == "__main__":
+    if "--verificar-indices" in sys.argv:
+        Database().verificar_indices()
+        print("Todas as consultas usam indice.")
+        sys.exit(0)
+    if "--manutencao" in sys.argv:
+        relatorio = Database().manutencao()
+        orfaos = ", ".join(f"{tabela}: {quantidade}" for tabela, quantidade in relatorio["orfaos"].items() if quantidade)
+        print(f"Registros orfaos removidos: {orfaos or 'nenhum'}")
+        print(f"Tamanho: {relatorio['bytes_antes'] / 1024:.0f} KiB -> {relatorio['bytes_depois'] / 1024:.0f} KiB "
+              f"({relatorio['recuperados'] / 1024:.0f} KiB recuperados)")
+        sys.exit(0)
+    if "--reconstruir-resumos" in sys.argv:
+        Database().reconstruir_resumos()
+        print("Resumos de notas reconstruidos.")
+        sys.exit(0)
     root = tk.Tk()
-    app = App(root)
+    servidor = sys.argv[sys.argv.index("--servidor") + 1] if "--servidor" in sys.argv else None
+    app = App(root, desempenho="--desempenho" in sys.argv, servidor=servidor)
     root.mainloop()
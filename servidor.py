@@ -0,0 +1,238 @@
+import argparse
+import asyncio
+import inspect
+import json
+import queue
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+from cliente import ESCRITAS, LEITURAS
+from database import Database, QueryCache
+
+TABELAS = ("Curso", "Disciplina", "Professor", "Aluno", "Matricula", "Nota")
+
+STATUS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 409: "Conflict",
+          413: "Payload Too Large", 500: "Internal Server Error"}
+
+
+class ErroRequisicao(Exception):
+    def __init__(self, status, mensagem):
+        super().__init__(mensagem)
+        self.status = status
+
+
+class Escritor:
+    # Unica conexao de escrita: agrupa as escritas que chegam juntas numa so transacao, com um
+    # savepoint por operacao para que a falha de uma nao desfaca as outras. Responde apos o commit.
+    def __init__(self, caminho, cache, max_lote=256, espera=0.002):
+        self.caminho = caminho
+        self.cache = cache
+        self.max_lote = max_lote
+        self.espera = espera
+        self.fila = queue.Queue()
+        self.pronto = threading.Event()
+        self.lotes = 0
+        self.operacoes = 0
+        self.thread = threading.Thread(target=self.executar, daemon=True)
+        self.thread.start()
+        self.pronto.wait()
+
+    def submeter(self, operacao, args, kwargs):
+        loop = asyncio.get_running_loop()
+        futuro = loop.create_future()
+        self.fila.put((operacao, args, kwargs, loop, futuro))
+        return futuro
+
+    def executar(self):
+        self.db = Database(self.caminho, desempenho=True, cache=self.cache)
+        self.db.podar_alteracoes()
+        self.colunas = {
+            tabela: {linha[1] for linha in self.db.conn.execute(f"PRAGMA table_info({tabela})")}
+            for tabela in TABELAS
+        }
+        self.pronto.set()
+        while True:
+            pedido = self.fila.get()
+            if pedido is None:
+                break
+            lote = [pedido]
+            while len(lote) < self.max_lote:
+                try:
+                    pedido = self.fila.get(timeout=self.espera)
+                except queue.Empty:
+                    break
+                if pedido is None:
+                    self.fila.put(None)
+                    break
+                lote.append(pedido)
+            self.aplicar(lote)
+        self.db.fechar()
+
+    def aplicar(self, lote):
+        respostas = []
+        try:
+            with self.db.transacao():
+                for operacao, args, kwargs, loop, futuro in lote:
+                    try:
+                        with self.db.transacao():
+                            respostas.append((loop, futuro, getattr(self.db, operacao)(*args, **kwargs), None))
+                    except Exception as erro:
+                        respostas.append((loop, futuro, None, erro))
+        except Exception as erro:
+            respostas = [(loop, futuro, None, erro) for _, _, _, loop, futuro in lote]
+        self.lotes += 1
+        self.operacoes += len(lote)
+        for loop, futuro, resultado, erro in respostas:
+            loop.call_soon_threadsafe(entregar, futuro, resultado, erro)
+
+    def parar(self):
+        self.fila.put(None)
+        self.thread.join()
+
+
+def entregar(futuro, resultado, erro):
+    if futuro.cancelled():
+        return
+    if erro is not None:
+        futuro.set_exception(erro)
+    else:
+        futuro.set_result(resultado)
+
+
+class Servidor:
+    # HTTP/1.1 com keep-alive sobre asyncio; leituras num pool de threads com uma conexao somente
+    # leitura cada, escritas serializadas no Escritor. O cache e compartilhado e invalidado pelo Escritor.
+    def __init__(self, caminho="university.db", leitores=4, max_lote=256, max_corpo=16 * 1024 * 1024):
+        self.caminho = caminho
+        self.max_corpo = max_corpo
+        self.cache = QueryCache()
+        self.escritor = Escritor(caminho, self.cache, max_lote)
+        self.local = threading.local()
+        self.leitores = ThreadPoolExecutor(max_workers=leitores, thread_name_prefix="leitor",
+                                           initializer=self.abrir_leitor)
+        self.assinaturas = {nome: inspect.signature(getattr(Database, nome)) for nome in LEITURAS | ESCRITAS}
+
+    def abrir_leitor(self):
+        self.local.db = Database(self.caminho, cache=self.cache, somente_leitura=True)
+
+    def ler(self, operacao, args, kwargs):
+        return getattr(self.local.db, operacao)(*args, **kwargs)
+
+    def validar(self, operacao, args, kwargs):
+        # Tabelas e colunas entram no SQL por interpolacao: so nomes conhecidos passam.
+        try:
+            parametros = self.assinaturas[operacao].bind(None, *args, **kwargs).arguments
+        except TypeError as erro:
+            raise ErroRequisicao(400, str(erro))
+        tabela = parametros.get("tabela")
+        if tabela is not None and tabela not in TABELAS:
+            raise ErroRequisicao(400, f"tabela desconhecida: {tabela}")
+        colunas = list(parametros.get("colunas") or ())
+        if parametros.get("coluna") is not None:
+            colunas.append(parametros["coluna"])
+        desconhecidas = [coluna for coluna in colunas if coluna not in self.escritor.colunas.get(tabela, ())]
+        if desconhecidas:
+            raise ErroRequisicao(400, f"colunas desconhecidas em {tabela}: {', '.join(map(str, desconhecidas))}")
+
+    async def despachar(self, metodo_http, caminho, corpo):
+        operacao = urlsplit(caminho).path.strip("/")
+        if operacao == "saude":
+            return {"status": "ok", "lotes": self.escritor.lotes, "escritas": self.escritor.operacoes,
+                    "cache": self.cache.estatisticas()}
+        if operacao not in LEITURAS and operacao not in ESCRITAS:
+            raise ErroRequisicao(404, f"operacao desconhecida: {operacao}")
+        if metodo_http != "POST":
+            raise ErroRequisicao(405, "use POST")
+        try:
+            pedido = json.loads(corpo or b"{}")
+            # Listas viram tuplas para servir de chave no cache.
+            args = [tuple(arg) if isinstance(arg, list) else arg for arg in pedido.get("args", [])]
+            kwargs = {nome: tuple(valor) if isinstance(valor, list) else valor
+                      for nome, valor in pedido.get("kwargs", {}).items()}
+        except (ValueError, AttributeError):
+            raise ErroRequisicao(400, "corpo JSON invalido")
+        self.validar(operacao, args, kwargs)
+        try:
+            if operacao in ESCRITAS:
+                return await self.escritor.submeter(operacao, args, kwargs)
+            return await asyncio.get_running_loop().run_in_executor(self.leitores, self.ler, operacao, args, kwargs)
+        except sqlite3.IntegrityError as erro:
+            raise ErroRequisicao(409, str(erro))
+        except sqlite3.Error as erro:
+            raise ErroRequisicao(400, str(erro))
+
+    async def atender(self, leitor, escritor):
+        try:
+            while True:
+                linha = await leitor.readline()
+                if not linha:
+                    break
+                try:
+                    metodo_http, caminho, _ = linha.decode("latin-1").split(" ", 2)
+                except ValueError:
+                    break
+                cabecalhos = {}
+                while True:
+                    cabecalho = await leitor.readline()
+                    if cabecalho in (b"\r\n", b"\n", b""):
+                        break
+                    nome, _, valor = cabecalho.decode("latin-1").partition(":")
+                    cabecalhos[nome.strip().lower()] = valor.strip()
+                tamanho = int(cabecalhos.get("content-length", 0))
+                if tamanho > self.max_corpo:
+                    await self.responder(escritor, 413, {"erro": "corpo grande demais"})
+                    break
+                corpo = await leitor.readexactly(tamanho)
+                try:
+                    status, resposta = 200, await self.despachar(metodo_http, caminho, corpo)
+                except ErroRequisicao as erro:
+                    status, resposta = erro.status, {"erro": str(erro)}
+                except Exception as erro:
+                    status, resposta = 500, {"erro": repr(erro)}
+                await self.responder(escritor, status, resposta)
+                if cabecalhos.get("connection", "").lower() == "close":
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            escritor.close()
+
+    async def responder(self, escritor, status, resposta):
+        dados = json.dumps(resposta, ensure_ascii=False).encode("utf-8")
+        escritor.write(f"HTTP/1.1 {status} {STATUS[status]}\r\nContent-Type: application/json; charset=utf-8\r\n"
+                       f"Content-Length: {len(dados)}\r\n\r\n".encode("latin-1") + dados)
+        await escritor.drain()
+
+    async def servir(self, host="127.0.0.1", porta=8765, pronto=None):
+        servidor = await asyncio.start_server(self.atender, host, porta)
+        if pronto:
+            pronto(servidor.sockets[0].getsockname())
+        async with servidor:
+            await servidor.serve_forever()
+
+    def fechar(self):
+        self.leitores.shutdown()
+        self.escritor.parar()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor HTTP/JSON local sobre o Database, para varios clientes.")
+    parser.add_argument("--banco", default="university.db")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--porta", type=int, default=8765)
+    parser.add_argument("--leitores", type=int, default=4, help="conexoes somente leitura no pool")
+    parser.add_argument("--lote", type=int, default=256, help="maximo de escritas por commit")
+    args = parser.parse_args()
+    servidor = Servidor(args.banco, args.leitores, args.lote)
+    try:
+        asyncio.run(servidor.servir(args.host, args.porta,
+                                    pronto=lambda endereco: print(f"Servindo {args.banco} em http://{endereco[0]}:{endereco[1]}")))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.fechar()
+
+
+if __name__ == "__main__":
+    main()
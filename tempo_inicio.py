@@ -0,0 +1,76 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from benchmark import popular, versao_git
+from database import Database
+
+PASTA_PROJETO = os.path.dirname(os.path.abspath(__file__))
+
+# Roda num processo novo a cada medicao, para incluir os imports. So usa App(root) e fecha com
+# root.destroy() quando o App antigo nao tem fechar(), entao tambem mede um checkout de outro
+# commit (--projeto) e permite comparar o antes e o depois.
+MEDIR = """
+import json, sys, time
+inicio = time.perf_counter()
+sys.path.insert(0, sys.argv[1])
+import tkinter as tk
+import main
+importado = time.perf_counter()
+root = tk.Tk()
+app = main.App(root)
+construido = time.perf_counter()
+root.update()
+quadro = time.perf_counter()
+print(json.dumps({"import_ms": (importado - inicio) * 1000, "app_ms": (construido - importado) * 1000,
+                  "primeiro_quadro_ms": (quadro - inicio) * 1000}))
+sys.stdout.flush()
+getattr(app, "fechar", root.destroy)()
+"""
+
+
+def medir(pasta, repeticoes, projeto=PASTA_PROJETO):
+    medicoes = []
+    for _ in range(repeticoes):
+        saida = subprocess.run([sys.executable, "-c", MEDIR, projeto], cwd=pasta, capture_output=True, text=True)
+        if saida.returncode != 0:
+            erro = saida.stderr.strip().splitlines()
+            sys.exit(f"A medicao de {projeto} falhou: {erro[-1] if erro else saida.returncode}")
+        medicoes.append(json.loads(saida.stdout.splitlines()[-1]))
+    return {
+        chave: {"mediana": statistics.median(m[chave] for m in medicoes), "minimo": min(m[chave] for m in medicoes)}
+        for chave in medicoes[0]
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mede o tempo ate o primeiro quadro da interface (requer display).")
+    parser.add_argument("--alunos", type=int, default=100000)
+    parser.add_argument("--notas", type=int, default=500000)
+    parser.add_argument("--repeticoes", type=int, default=5)
+    parser.add_argument("--banco", help="usa este banco em vez de gerar um temporario")
+    parser.add_argument("--projeto", default=PASTA_PROJETO, help="checkout cujo main.py sera medido (ex.: git worktree de outro commit)")
+    parser.add_argument("--saida", help="grava o JSON neste arquivo em vez da saida padrao")
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as pasta:
+        if args.banco:
+            os.symlink(os.path.abspath(args.banco), os.path.join(pasta, "university.db"))
+        else:
+            db = Database(os.path.join(pasta, "university.db"))
+            popular(db, cursos=50, disciplinas=2000, professores=1000, alunos=args.alunos, notas=args.notas)
+            db.fechar()
+        resultado = medir(pasta, args.repeticoes, os.path.abspath(args.projeto))
+    relatorio = json.dumps({"commit": versao_git(args.projeto), "alunos": args.alunos, "notas": args.notas,
+                            "repeticoes": args.repeticoes, "tempos": resultado}, indent=2, ensure_ascii=False)
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as arquivo:
+            arquivo.write(relatorio + "\n")
+    else:
+        print(relatorio)
+
+
+if __name__ == "__main__":
+    main()